@@ -1,25 +1,30 @@
 import dash_bootstrap_components as dbc
-import plotly.graph_objects as go
-import plotly.io as pio
-from plotly.subplots import make_subplots
+import orjson
 from dash import Dash, html, Input, Output, ctx, no_update, State
 from dash.dcc import send_data_frame
 from dash.exceptions import PreventUpdate
+from flask import request
+from dotenv import load_dotenv
+
+# load environment variables from .env before the modules below read them on
+# import
+load_dotenv()
 
-import textwrap
 from pandas import DataFrame, concat
-from flask_caching import Cache
-from modules.calc import get_options_data
-from modules.ticker_dwn import dwn_data
+from modules.sessions import ensure_table
+from modules.calc import exposure_grid
+from modules.results import cache_data, data_version, get_sync
+from modules.charts import (
+    chart_view,
+    figure_update,
+    get_figure,
+    is_single_page,
+)
+from modules.ingest import start_ingest
+from modules.updates import wait_for_update
 from modules.layout import serve_layout
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers import cron, combining
-from datetime import timedelta
-from zoneinfo import ZoneInfo
-from dotenv import load_dotenv
-from os import environ
 
-load_dotenv()  # load environment variables from .env
+ensure_table()  # build or load the exchange session table before any request
 
 app = Dash(
     __name__,
@@ -35,114 +40,12 @@ app = Dash(
     update_title=None,
 )
 
-cache = Cache(
-    app.server,
-    config={
-        "CACHE_TYPE": "FileSystemCache",
-        "CACHE_DIR": "cache",
-        "CACHE_THRESHOLD": 150,
-    },
-)
-
-cache.clear()
-
 app.layout = serve_layout
 server = app.server
 
-
-@cache.memoize(timeout=60 * 15)  # cache charts for 15 min
-def analyze_data(ticker, expir):
-    # Analyze stored data of specified ticker and expiry
-    # defaults: json format, timezone 'America/New_York'
-    result = get_options_data(
-        ticker,
-        expir,
-        is_json=True,  # False for CSV
-        tz="America/New_York",
-    )
-    return result if result else (None,) * 16
-
-
-def cache_data(ticker, expir):
-    data = analyze_data(ticker, expir)
-    if not cache.has(f"{ticker}_{expir}"):
-        cache.set(  # for client/server sync
-            f"{ticker}_{expir}",
-            {
-                "ticker": ticker,
-                "expiration": expir,
-                "spot_price": data[4],
-                "monthly_options_dates": data[3],
-                "today_ddt": data[1],
-                "today_ddt_string": data[2],
-                "zero_delta": data[12],
-                "zero_gamma": data[13],
-            },
-        )
-    return data
-
-
-def sensor(select=None):
-    # default: all tickers, json format
-    dwn_data(select, is_json=True)  # False for CSV
-    cache.clear()
-
-
-def check_for_retry():
-    tickers = cache.get("retry")
-    if tickers:
-        print("\nRedownloading data due to missing greek exposure...\n")
-        sensor(select=tickers)
-
-
-# respond to prompt if env variable not set
-response = environ.get("AUTO_RESPONSE")
-if not response:
-    try:
-        response = input("\nDownload recent data? (y/n): ")
-    except EOFError:
-        response = "n"
-if response.strip().lower() == "y":  # download data at start
-    sensor()
-else:
-    print("\nUsing existing data...\n")
-
-# schedule when to redownload data
-sched = BackgroundScheduler(daemon=True)
-sched.add_job(
-    sensor,
-    combining.OrTrigger(
-        [
-            cron.CronTrigger.from_crontab(
-                "0,15,30,45 9-15 * * 0-4", timezone=ZoneInfo("America/New_York")
-            ),
-            cron.CronTrigger.from_crontab(
-                "0,15,30 16 * * 0-4", timezone=ZoneInfo("America/New_York")
-            ),
-        ]
-    ),
-)
-sched.add_job(
-    check_for_retry,
-    combining.OrTrigger(
-        [
-            cron.CronTrigger(
-                day_of_week="0-4",
-                hour="9-15",
-                second="*/5",
-                timezone=ZoneInfo("America/New_York"),
-            ),
-            cron.CronTrigger(
-                day_of_week="0-4",
-                hour="16",
-                minute="0-30",
-                second="*/5",
-                timezone=ZoneInfo("America/New_York"),
-            ),
-        ]  # during the specified times, check every 5 seconds for a retry condition
-    ),
-)
-sched.start()
+# downloads and precomputing run in a single ingest process, elected among the
+# web workers unless started on its own; see modules/ingest
+start_ingest()
 
 
 app.clientside_callback(  # toggle light or dark theme
@@ -230,6 +133,7 @@ def on_click(btn1, btn2, btn3, btn4, active_page, value, greek):
                     "Absolute Delta Exposure",
                     "Delta Exposure By Calls/Puts",
                     "Delta Exposure Profile",
+                    "Delta Exposure Heatmap",
                 ],
                 "Absolute Delta Exposure",
             ),
@@ -242,6 +146,7 @@ def on_click(btn1, btn2, btn3, btn4, active_page, value, greek):
                     "Absolute Gamma Exposure",
                     "Gamma Exposure By Calls/Puts",
                     "Gamma Exposure Profile",
+                    "Gamma Exposure Heatmap",
                 ],
                 "Absolute Gamma Exposure",
             ),
@@ -254,6 +159,7 @@ def on_click(btn1, btn2, btn3, btn4, active_page, value, greek):
                     "Absolute Vanna Exposure",
                     "Implied Volatility Average",
                     "Vanna Exposure Profile",
+                    "Vanna Exposure Heatmap",
                 ],
                 "Absolute Vanna Exposure",
             ),
@@ -265,6 +171,7 @@ def on_click(btn1, btn2, btn3, btn4, active_page, value, greek):
                 [
                     "Absolute Charm Exposure",
                     "Charm Exposure Profile",
+                    "Charm Exposure Heatmap",
                 ],
                 "Absolute Charm Exposure",
             ),
@@ -292,39 +199,30 @@ def on_click(btn1, btn2, btn3, btn4, active_page, value, greek):
     )
 
 
+@server.route("/updates")
+def updates():  # long-poll for newly published data, see modules/updates
+    return wait_for_update(request.args.get("known", ""))
+
+
 @app.callback(  # handle refreshed data
     Output("refresh", "data"),
-    Output("interval", "n_intervals"),
-    Input("interval", "n_intervals"),
+    Input("generations", "data"),
     State("tabs", "active_tab"),
     State("exp-value", "data"),
-    State("live-chart", "figure"),
+    State("chart-version", "data"),
 )
-def check_cache_key(n_intervals, stock, expiration, fig):
-    data = cache.get(f"{stock.lower()}_{expiration}")
+def check_cache_key(generations, stock, expiration, rendered):
+    data = get_sync(stock.lower(), expiration)
     if not data and stock and expiration:
         cache_data(stock.lower(), expiration)
     if (
         data
-        and (fig and fig["data"])
-        and (
-            data["today_ddt_string"]
-            and data["ticker"] == stock.lower()
-            and data["ticker"].upper()
-            in fig["layout"]["title"]["text"].replace("<br>", " ")
-            and data["expiration"] == expiration
-        )
-        and (
-            data["today_ddt_string"]
-            not in fig["layout"]["title"]["text"].replace("<br>", " ")
-            or (
-                "shapes" in fig["layout"]
-                and "name" in fig["layout"]["shapes"][-1]
-                and data["spot_price"] != fig["layout"]["shapes"][-1]["x0"]
-            )
-        )
+        and rendered
+        and rendered["data"]["ticker"] == stock.lower()
+        and rendered["data"]["expiration"] == expiration
+        and rendered["data"] != data_version(stock.lower(), expiration)
     ):  # refresh on current selection if client data differs from server cache
-        return data, 0
+        return data
     raise PreventUpdate
 
 
@@ -340,7 +238,7 @@ def check_cache_key(n_intervals, stock, expiration, fig):
     prevent_initial_call=True,
 )
 def handle_menu(btn1, btn2, stock, expiration, active_page, value, fig):
-    data = cache.get(f"{stock.lower()}_{expiration}")
+    data = get_sync(stock.lower(), expiration)
     if not data or not data["today_ddt"] or not fig["data"]:
         raise PreventUpdate
 
@@ -359,67 +257,82 @@ def handle_menu(btn1, btn2, stock, expiration, active_page, value, fig):
     else:
         exp_date = "All_Expirations"
 
-    date_condition = active_page == 2 and not "Profile" in value
+    date_condition = (
+        active_page == 2 and not "Profile" in value and not "Heatmap" in value
+    )
     prefix = "Strikes" if not date_condition else "Dates"
     formatted_date = str(data["today_ddt"]).replace(" ", "_")
     chart_name = value.replace(" ", "_")
     filename = f"{prefix}_{chart_name}_{exp_date}__{formatted_date}.csv"
 
-    # --- X-axis Data (DataFrame Index) Preparation ---
-
-    # Get the x-axis data from the figure
-    x_data_source = fig_data[0].get("x")
-
-    if x_data_source is None:
-        raise PreventUpdate("X-axis data (fig_data[0]['x']) is missing.")
-
-    # Determine how to extract index values based on the type of x_data_source
-    if isinstance(x_data_source, list):
-        index_values = x_data_source
-    elif isinstance(x_data_source, dict) and "_inputArray" in x_data_source:
-        input_array = x_data_source.get("_inputArray")
-        if isinstance(input_array, dict):
-            # Extract values from the dictionary where keys are digits
-            index_values = [v for k, v in input_array.items() if k.isdigit()]
-        else:
-            raise PreventUpdate("fig_data[0]['x']['_inputArray'] is not a dictionary.")
-    else:
-        raise PreventUpdate(
-            f"Unrecognized type for fig_data[0]['x']: {type(x_data_source)}."
+    if "Heatmap" in value:
+        # a heatmap's grid comes straight from the cached cube: expiries as
+        # columns, strikes as rows
+        expiries, strikes, grid = exposure_grid(
+            cache_data(stock.lower(), expiration)[0],
+            f"total_{value.split()[0].lower()}",
         )
+        df_agg = DataFrame(grid.T, index=strikes, columns=expiries.strftime("%Y-%m-%d"))
+    else:
+        # --- X-axis Data (DataFrame Index) Preparation ---
+
+        # Get the x-axis data from the figure
+        x_data_source = fig_data[0].get("x")
+
+        if x_data_source is None:
+            raise PreventUpdate("X-axis data (fig_data[0]['x']) is missing.")
+
+        # Determine how to extract index values based on the type of x_data_source
+        if isinstance(x_data_source, list):
+            index_values = x_data_source
+        elif isinstance(x_data_source, dict) and "_inputArray" in x_data_source:
+            input_array = x_data_source.get("_inputArray")
+            if isinstance(input_array, dict):
+                # Extract values from the dictionary where keys are digits
+                index_values = [v for k, v in input_array.items() if k.isdigit()]
+            else:
+                raise PreventUpdate(
+                    "fig_data[0]['x']['_inputArray'] is not a dictionary."
+                )
+        else:
+            raise PreventUpdate(
+                f"Unrecognized type for fig_data[0]['x']: {type(x_data_source)}."
+            )
 
-    # --- Y-axis Data (DataFrame Columns) Preparation ---
-
-    # Extract y-series data and column names
-    def extract_series_data(item):
-        y_component = item.get("y")
-        series_name = item.get("name", "Unnamed Series")
-
-        if isinstance(y_component, dict) and "_inputArray" in y_component:
-            input_array = y_component.get("_inputArray")
-            if isinstance(input_array, dict) and input_array:
-                series_values = [v for k, v in input_array.items() if k.isdigit()]
-                return (series_values, series_name) if series_values else None
-        elif isinstance(y_component, list) and y_component:
-            return (y_component, series_name)
-        return None
-
-    valid_series = [
-        result for item in fig_data if (result := extract_series_data(item)) is not None
-    ]
+        # --- Y-axis Data (DataFrame Columns) Preparation ---
+
+        # Extract y-series data and column names
+        def extract_series_data(item):
+            y_component = item.get("y")
+            series_name = item.get("name", "Unnamed Series")
+
+            if isinstance(y_component, dict) and "_inputArray" in y_component:
+                input_array = y_component.get("_inputArray")
+                if isinstance(input_array, dict) and input_array:
+                    series_values = [v for k, v in input_array.items() if k.isdigit()]
+                    return (series_values, series_name) if series_values else None
+            elif isinstance(y_component, list) and y_component:
+                return (y_component, series_name)
+            return None
+
+        valid_series = [
+            result
+            for item in fig_data
+            if (result := extract_series_data(item)) is not None
+        ]
 
-    if not valid_series:
-        raise PreventUpdate("No data series with values found to create DataFrame.")
+        if not valid_series:
+            raise PreventUpdate("No data series with values found to create DataFrame.")
 
-    y_series_data, column_names = zip(*valid_series)
+        y_series_data, column_names = zip(*valid_series)
 
-    # --- DataFrame Creation ---
+        # --- DataFrame Creation ---
 
-    df_agg = DataFrame(
-        data=list(zip(*y_series_data)),
-        index=index_values,
-        columns=column_names,
-    )
+        df_agg = DataFrame(
+            data=list(zip(*y_series_data)),
+            index=index_values,
+            columns=column_names,
+        )
     df_agg.index.name = prefix
 
     if ctx.triggered_id == "btn-chart-data":
@@ -454,114 +367,38 @@ def handle_menu(btn1, btn2, stock, expiration, active_page, value, fig):
     Output("live-chart", "style"),
     Output("pagination-div", "hidden"),
     Output("monthly-options", "options"),
+    Output("chart-version", "data"),
     Input("live-dropdown", "value"),
     Input("tabs", "active_tab"),
     Input("exp-value", "data"),
     Input("pagination", "active_page"),
     Input("refresh", "data"),
     Input("switch", "value"),
+    State("chart-version", "data"),
 )
-def update_live_chart(value, stock, expiration, active_page, refresh, toggle_dark):
-    (
-        df,
-        today_ddt,
-        today_ddt_string,
-        monthly_options_dates,
-        spot_price,
-        from_strike,
-        to_strike,
-        levels,
-        totaldelta,
-        totalgamma,
-        totalvanna,
-        totalcharm,
-        zerodelta,
-        zerogamma,
-        call_ivs,
-        put_ivs,
-    ) = cache_data(stock.lower(), expiration)
-
-    # chart theme and layout
-    xaxis, yaxis = dict(
-        gridcolor="lightgray", minor=dict(ticklen=5, tickcolor="#000", showgrid=True)
-    ), dict(gridcolor="lightgray", minor=dict(tickcolor="#000"))
-    layout = {
-        "title_x": 0.5,
-        "title_font_size": 12.5,
-        "title_xref": "paper",
-        "legend": dict(
-            orientation="v",
-            yanchor="top",
-            xanchor="right",
-            y=0.98,
-            x=0.98,
-            bgcolor="rgba(0,0,0,0.1)",
-            font_size=10,
-        ),
-        "showlegend": True,
-        "margin": dict(l=0, r=40),
-        "xaxis": xaxis,
-        "yaxis": yaxis,
-        "dragmode": "pan",
+def update_live_chart(
+    value, stock, expiration, active_page, refresh, toggle_dark, rendered
+):
+    ticker = stock.lower()
+    monthly_options_dates = cache_data(ticker, expiration)[3]
+    version = {  # taken before rendering, so data published meanwhile refreshes
+        "data": data_version(ticker, expiration),
+        "view": chart_view(expiration, value, active_page, toggle_dark),
     }
-    if not toggle_dark:
-        # light theme
-        pio.templates["custom_template"] = pio.templates["seaborn"]
-    else:
-        # dark theme
-        pio.templates["custom_template"] = pio.templates["plotly_dark"]
-        for axis in [xaxis, yaxis]:
-            axis["gridcolor"], axis["minor"]["tickcolor"] = "#373737", "#707070"
-        layout["paper_bgcolor"] = "#222222"
-        layout["plot_bgcolor"] = "rgba(40, 40, 50, 0.8)"
-    pio.templates["custom_template"].update(layout=layout)
-    pio.templates.default = "custom_template"
-
-    if df is None:
-        return (
-            go.Figure(layout={"title_text": f"{stock} data unavailable, retry later"}),
-            {},
-            True,
-            no_update,
-        )
+    # the figure is served from the figure cache, see charts, and rendered
+    # from the generation the version names. the serialized figure is sent
+    # as it is rather than parsed and serialized again
+    gen = version["data"]["generation"]
+    fig = get_figure(stock, expiration, value, active_page, toggle_dark, gen)
+    patched = None
+    if rendered and rendered["data"]["ticker"] == ticker and gen is not None:
+        # when the traces stay the same kind, as on a theme or spot change,
+        # only the properties that changed are sent
+        patched = figure_update(ticker, rendered, gen, version["view"])
+    fig = patched if patched is not None else orjson.Fragment(fig)
+    if monthly_options_dates is None:
+        return fig, {}, True, no_update, version
 
-    retry_cache = cache.get("retry")
-    if (
-        df["total_delta"].sum() == 0
-        and (not retry_cache or stock not in retry_cache)
-        and (
-            expiration not in ["0dte", "opex"]
-            or (
-                expiration == "0dte"
-                and today_ddt < monthly_options_dates[0] + timedelta(minutes=15)
-            )
-            or (
-                expiration == "opex"
-                and today_ddt < monthly_options_dates[1] + timedelta(minutes=15)
-            )
-        )
-    ):
-        # if data hasn't expired and total delta exposure is 0,
-        # set a 'retry' for the scheduler to catch
-        retry_cache = retry_cache or []
-        retry_cache.append(stock)
-        cache.set("retry", retry_cache)
-
-    date_condition = active_page == 2 and not "Profile" in value
-    if not date_condition:
-        df_agg = df.groupby(["strike_price"]).sum(numeric_only=True)
-        df_agg = df_agg[from_strike:to_strike]  # filter for relevance
-        call_ivs, put_ivs = call_ivs["strike"], put_ivs["strike"]
-    else:  # use dates
-        df_agg = df.groupby(["expiration_date"]).sum(numeric_only=True)
-        # df_agg = df_agg[: today_ddt + timedelta(weeks=52)] # filter for relevance
-        call_ivs, put_ivs = call_ivs["exp"], put_ivs["exp"]
-
-    date_formats = {
-        "monthly": monthly_options_dates[0].strftime("%Y %b"),
-        "opex": monthly_options_dates[1].strftime("%Y %b %d"),
-        "0dte": monthly_options_dates[0].strftime("%Y %b %d"),
-    }
     monthly_options = [  # provide monthly option labels
         {
             "label": monthly_options_dates[0].strftime("%Y %B"),
@@ -582,288 +419,8 @@ def update_live_chart(value, stock, expiration, active_page, refresh, toggle_dar
             "value": "0dte-btn",
         },
     ]
-    legend_title = (
-        date_formats[expiration] if expiration != "all" else "All Expirations"
-    )
-
-    strikes = df_agg.index.to_numpy()
-
-    is_profile_or_volatility = "Profile" in value or "Average" in value
-    name = value.split()[1] if "Absolute" in value else value.split()[0]
-
-    name_to_vals = {
-        "Delta": (
-            f"per 1% {stock} Move",
-            f"{name} Exposure (price / 1% move)",
-            zerodelta,
-        ),
-        "Gamma": (
-            f"per 1% {stock} Move",
-            f"{name} Exposure (delta / 1% move)",
-            zerogamma,
-        ),
-        "Vanna": (
-            f"per 1% {stock} IV Move",
-            f"{name} Exposure (delta / 1% IV move)",
-            0,
-        ),
-        "Charm": (
-            f"a day til {stock} Expiry",
-            f"{name} Exposure (delta / day til expiry)",
-            0,
-        ),
-        "Implied": ("", "Implied Volatility (IV) Average", 0),
-    }
-
-    description, y_title, zeroflip = name_to_vals[name]
-    yaxis.update(title_text=y_title)
-    scale = 10**9
-
-    if "Absolute" in value:
-        fig = go.Figure(
-            data=[
-                go.Bar(
-                    name=name + " Exposure",
-                    x=strikes,
-                    y=df_agg[f"total_{name.lower()}"].to_numpy(),
-                    marker=dict(
-                        line=dict(
-                            width=0.25,
-                            color=("#2B5078" if not toggle_dark else "#8795FA"),
-                        ),
-                    ),
-                )
-            ]
-        )
-    elif "Calls/Puts" in value:
-        fig = go.Figure(
-            data=[
-                go.Bar(
-                    name="Call " + name,
-                    x=strikes,
-                    y=df_agg[f"call_{name[:1].lower()}ex"].to_numpy() / scale,
-                    marker=dict(
-                        line=dict(
-                            width=0.25,
-                            color=("#2B5078" if not toggle_dark else "#8795FA"),
-                        ),
-                    ),
-                ),
-                go.Bar(
-                    name="Put " + name,
-                    x=strikes,
-                    y=df_agg[f"put_{name[:1].lower()}ex"].to_numpy() / scale,
-                    marker=dict(
-                        line=dict(
-                            width=0.25,
-                            color=("#9B5C30" if not toggle_dark else "#F5765B"),
-                        ),
-                    ),
-                ),
-            ]
-        )
-
-    if not is_profile_or_volatility:
-        split_title = textwrap.wrap(
-            f"Total {name}: $"
-            + str("{:,.2f}".format(df[f"total_{name.lower()}"].sum() * scale))
-            + f" {description}, {today_ddt_string}",
-            width=50,
-        )
-        fig.update_layout(  # bar chart layout
-            title_text="<br>".join(split_title),
-            legend_title_text=legend_title,
-            xaxis=xaxis,
-            yaxis=yaxis,
-            barmode="relative",
-            modebar_remove=["autoscale", "lasso2d"],
-        )
-    if is_profile_or_volatility:
-        fig = make_subplots(rows=1, cols=1)
-        if not date_condition and name != "Implied":  # chart profiles
-            split_title = textwrap.wrap(
-                f"{stock} {name} Exposure Profile, {today_ddt_string}", width=50
-            )
-            name_to_vals = {
-                "Delta": (
-                    totaldelta["all"],
-                    totaldelta["ex_next"],
-                    totaldelta["ex_fri"],
-                ),
-                "Gamma": (
-                    totalgamma["all"],
-                    totalgamma["ex_next"],
-                    totalgamma["ex_fri"],
-                ),
-                "Vanna": (
-                    totalvanna["all"],
-                    totalvanna["ex_next"],
-                    totalvanna["ex_fri"],
-                ),
-                "Charm": (
-                    totalcharm["all"],
-                    totalcharm["ex_next"],
-                    totalcharm["ex_fri"],
-                ),
-            }
-            all_ex, ex_next, ex_fri = name_to_vals[name]
-            fig.add_trace(go.Scatter(x=levels, y=all_ex, name="All Expiries"))
-            fig.add_trace(go.Scatter(x=levels, y=ex_fri, name="Next Monthly Expiry"))
-            fig.add_trace(go.Scatter(x=levels, y=ex_next, name="Next Expiry"))
-            # show - &/or + areas of exposure depending on condition
-            if name == "Charm" or name == "Vanna":
-                all_ex_min, all_ex_max = all_ex.min(), all_ex.max()
-                min_n = [
-                    all_ex_min,
-                    ex_fri.min() if ex_fri.size != 0 else all_ex_min,
-                    ex_next.min() if ex_next.size != 0 else all_ex_min,
-                ]
-                max_n = [
-                    all_ex_max,
-                    ex_fri.max() if ex_fri.size != 0 else all_ex_max,
-                    ex_next.max() if ex_next.size != 0 else all_ex_max,
-                ]
-                min_n.sort()
-                max_n.sort()
-                if min_n[0] < 0:
-                    fig.add_hrect(
-                        y0=0,
-                        y1=min_n[0] * 1.5,
-                        fillcolor="red",
-                        opacity=0.1,
-                        line_width=0,
-                    )
-                if max_n[2] > 0:
-                    fig.add_hrect(
-                        y0=0,
-                        y1=max_n[2] * 1.5,
-                        fillcolor="green",
-                        opacity=0.1,
-                        line_width=0,
-                    )
-                fig.add_hline(
-                    y=0,
-                    line_width=0,
-                    name=name + " Flip",
-                    annotation_text=name + " Flip",
-                    annotation_position="top left",
-                )
-            # greek has a - to + flip
-            elif zeroflip > 0:
-                fig.add_vline(
-                    x=zeroflip,
-                    line_color="dimgray",
-                    line_width=1,
-                    name=name + " Flip",
-                    annotation_text=name + " Flip: " + str("{:,.0f}".format(zeroflip)),
-                    annotation_position="top left",
-                )
-                fig.add_vrect(
-                    x0=from_strike,
-                    x1=zeroflip,
-                    fillcolor="red",
-                    opacity=0.1,
-                    line_width=0,
-                )
-                fig.add_vrect(
-                    x0=zeroflip,
-                    x1=to_strike,
-                    fillcolor="green",
-                    opacity=0.1,
-                    line_width=0,
-                )
-            # flip unknown, assume - dominance
-            elif all_ex[0] < 0:
-                fig.add_vrect(
-                    x0=from_strike,
-                    x1=to_strike,
-                    fillcolor="red",
-                    opacity=0.1,
-                    line_width=0,
-                )
-            # flip unknown, assume + dominance
-            elif all_ex[0] > 0:
-                fig.add_vrect(
-                    x0=from_strike,
-                    x1=to_strike,
-                    fillcolor="green",
-                    opacity=0.1,
-                    line_width=0,
-                )
-        elif name == "Implied":  # in IV section, chart put/call IV averages
-            fig.add_trace(
-                go.Scatter(
-                    x=strikes,
-                    y=put_ivs * 100,
-                    name="Put IV",
-                    fill="tozeroy",
-                    line_color="#C44E52",
-                )
-            )
-            fig.add_trace(
-                go.Scatter(
-                    x=strikes,
-                    y=call_ivs * 100,
-                    name="Call IV",
-                    fill="tozeroy",
-                    line_color="#32A3A3",
-                )
-            )
-            split_title = textwrap.wrap(
-                f"{stock} IV Average, {today_ddt_string}", width=50
-            )
-        fig.add_hline(
-            y=0,
-            line_width=1,
-            line_color="dimgray",
-        )
-        fig.update_layout(  # scatter chart layout
-            title_text="<br>".join(split_title),
-            legend_title_text=legend_title,
-            xaxis=xaxis,
-            yaxis=yaxis,
-            modebar_remove=["autoscale"],
-        )
-
-    fig.update_xaxes(
-        title="Strike" if not date_condition else "Date",
-        showgrid=True,
-        range=(
-            [spot_price * 0.9, spot_price * 1.1]
-            if not date_condition
-            else (
-                [
-                    strikes[0] - timedelta(seconds=0.0625),
-                    strikes[0] + timedelta(seconds=0.0625),
-                ]
-                if len(strikes) == 1
-                else [today_ddt, today_ddt + timedelta(days=31)]
-            )
-        ),
-        gridwidth=1,
-        rangeslider=dict(visible=True),
-    )
-    fig.update_yaxes(
-        showgrid=True,
-        fixedrange=True,
-        minor_ticks="inside",
-        gridwidth=1,
-    )
-
-    if not date_condition:
-        fig.add_vline(
-            x=spot_price,
-            line_color="#707070",
-            line_width=1,
-            line_dash="dash",
-            name=stock + " Spot",
-            annotation_text="Last: " + str("{:,.2f}".format(spot_price)),
-            annotation_position="top",
-        )
-
-    is_pagination_hidden = "Profile" in value
 
-    return fig, {}, is_pagination_hidden, monthly_options
+    return fig, {}, is_single_page(value), monthly_options, version
 
 
 if __name__ == "__main__":
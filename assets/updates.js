@@ -0,0 +1,26 @@
+// Wait on the server for newly published data instead of polling it on a timer.
+// Each reply carries the generation of every ticker; the charts check for a
+// refresh only when one has changed. When the server is already holding as
+// many requests as it allows, it replies at once with when to ask again
+;(async () => {
+  let token = ''
+  while (true) {
+    try {
+      const response = await fetch(`updates?known=${encodeURIComponent(token)}`)
+      if (!response.ok) throw new Error(response.statusText)
+      const update = await response.json()
+      if (token && update.token !== token) {
+        window.dash_clientside.set_props('generations', {
+          data: update.generations,
+        })
+      }
+      token = update.token
+      if (update.retry) {
+        await new Promise((resolve) => setTimeout(resolve, update.retry * 1000))
+      }
+    } catch (e) {
+      // server restarting or unreachable, try again shortly
+      await new Promise((resolve) => setTimeout(resolve, 5000))
+    }
+  }
+})()
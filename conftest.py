@@ -0,0 +1,3 @@
+# tests import the app's modules from the repo root, as the app itself does,
+# and read the bundled chains from data/ relative to it. pytest puts the
+# directory of this file on sys.path
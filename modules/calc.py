@@ -1,17 +1,15 @@
 import pandas as pd
-import exchange_calendars as xcals
 import numpy as np
 import orjson
 import modules.stats as stats
-from yfinance import Ticker
+import modules.sessions as sessions
+from modules.rates import risk_free_rate
 from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
 from dateparser.date import DateDataParser
 from warnings import simplefilter
-from calendar import monthrange
-from cachetools import cached, TTLCache
 from pathlib import Path
 from os import getcwd
+from io import BytesIO, TextIOWrapper
 from re import compile
 
 # Ignore warning for NaN values in dataframe
@@ -23,37 +21,21 @@ pd.options.display.float_format = "{:,.4f}".format
 _strike_regex = compile(r"\d[A-Z](\d+)\d\d\d")
 _exp_date_regex = compile(r"[A-Z](\d+)")
 
-
-@cached(cache=TTLCache(maxsize=16, ttl=60 * 60 * 4))  # in-memory cache for 4 hrs
-def is_third_friday(date, tz):
-    _, last = monthrange(date.year, date.month)
-    first = datetime(date.year, date.month, 1)
-    last = datetime(date.year, date.month, last)
-    result = xcals.get_calendar("XNYS", start=first, end=last)
-    result = result.sessions.to_pydatetime()
-    found = [False, False]
-    for i in result:
-        if i.weekday() == 4 and 15 <= i.day <= 21 and i.month == date.month:
-            # Third Friday
-            found[0] = i.replace(tzinfo=ZoneInfo(tz)) + timedelta(hours=16)
-        elif i.weekday() == 3 and 15 <= i.day <= 21 and i.month == date.month:
-            # Thursday alternative
-            found[1] = i.replace(tzinfo=ZoneInfo(tz)) + timedelta(hours=16)
-    # returns Third Friday if market open,
-    # else if market closed returns the Thursday before it
-    return (found[0], result) if found[0] else (found[1], result)
-
-
-# check 10 yr treasury yield
-@cached(cache=TTLCache(maxsize=16, ttl=60 * 15))  # in-memory cache for 15 min
-def check_ten_yr(date):
-    data = Ticker("^TNX").history(start=date - timedelta(days=5), end=date)
-    if data.empty:
-        # no data for the date range so look back further
-        return check_ten_yr(date - timedelta(days=2))
-    else:
-        # most recent date
-        return data.tail(1)["Close"].item() / 100
+# columns of the chain that the charts aggregate
+_exposure_cols = [
+    "call_dex",
+    "put_dex",
+    "call_gex",
+    "put_gex",
+    "call_vex",
+    "put_vex",
+    "call_cex",
+    "put_cex",
+    "total_delta",
+    "total_gamma",
+    "total_vanna",
+    "total_charm",
+]
 
 
 def is_parsable(date):
@@ -100,12 +82,12 @@ def format_data(data, today_ddt, tzinfo):
         data["expiration_date"], format="%y%m%d"
     ).dt.tz_localize(tzinfo) + timedelta(hours=16)
 
-    busday_counts = np.busday_count(
+    busday_counts = sessions.busday_count(
         today_ddt.date(),
         data["expiration_date"].values.astype("datetime64[D]"),
     )
     # set DTE. 0DTE options are included in 1 day expirations
-    # time to expiration in years (252 trading days)
+    # time to expiration in years (252 trading days), skipping exchange holidays
     data["time_till_exp"] = np.where(busday_counts == 0, 1 / 252, busday_counts / 252)
 
     data = data.sort_values(by=["expiration_date", "strike_price"]).reset_index(
@@ -115,8 +97,131 @@ def format_data(data, today_ddt, tzinfo):
     return data
 
 
+def compact_chain(option_data):
+    # shrink the chain kept in each cached result to what the charts read:
+    # strikes, expiries and exposures. float32 keeps about 7 significant
+    # digits (a relative error under 6e-8), so a 4-decimal input such as
+    # 0.1234 is stored to within about 1e-8 rather than exactly: well past
+    # the precision of the exposures derived from them. expiries become small
+    # integer codes into a table of the unique dates
+    return (
+        option_data[["strike_price", "expiration_date", *_exposure_cols]]
+        .astype(
+            {
+                "strike_price": np.float32,
+                "expiration_date": "category",
+                **{col: np.float32 for col in _exposure_cols},
+            }
+        )
+        .reset_index(drop=True)
+    )
+
+
+def exposure_cube(option_data, from_strike, to_strike):
+    # strike x expiry aggregate of a snapshot, built once so the charts only
+    # slice it: the chain's cells (one per strike and expiry, so the cube is
+    # kept sparse), exposures summed and IVs averaged over each strike and each
+    # expiry, and the chain's totals. sums are taken over the float64 chain
+    # and only then stored as float32, so no rounding error accumulates: the
+    # totals printed to the cent stay float64
+    cells = compact_chain(option_data)
+    exposures = option_data[["strike_price", "expiration_date", *_exposure_cols]]
+    ivs = option_data[["strike_price", "expiration_date", "call_iv", "put_iv"]]
+    by_strike = (
+        exposures.drop(columns="expiration_date")
+        .groupby("strike_price")
+        .sum()
+        .astype(np.float32)
+    )
+    by_strike.index = by_strike.index.astype(np.float32)  # as in the cells
+    # both grouped from the same chain, so strikes / expiries line up
+    by_strike[["call_iv", "put_iv"]] = (
+        ivs.drop(columns="expiration_date").groupby("strike_price").mean().to_numpy()
+    )
+    by_exp = (
+        exposures.drop(columns="strike_price")
+        .groupby("expiration_date")
+        .sum()
+        .astype(np.float32)
+    )
+    by_exp[["call_iv", "put_iv"]] = (
+        ivs.drop(columns="strike_price").groupby("expiration_date").mean().to_numpy()
+    )
+    by_exp.index = pd.DatetimeIndex(by_exp.index)
+    return {
+        "cells": cells,
+        "strike": by_strike[from_strike:to_strike],  # filter for relevance
+        "exp": by_exp,
+        "total": {col: float(option_data[col].sum()) for col in _exposure_cols},
+    }
+
+
+def exposure_grid(cube, column):
+    # dense expiry x strike grid of a column, over the strikes charted. cells
+    # without a contract are left empty
+    cells, expiries, strikes = cube["cells"], cube["exp"].index, cube["strike"].index
+    cols = strikes.get_indexer(cells["strike_price"])  # -1: out of range
+    rows = cells["expiration_date"].cat.codes.to_numpy()
+    charted = cols >= 0
+    grid = np.full((len(expiries), len(strikes)), np.nan)
+    grid[rows[charted], cols[charted]] = cells[column].to_numpy()[charted]
+    return expiries, strikes, grid
+
+
+def index_expiries(option_data):
+    # the chain is sorted by expiry, so keep its unique expiries and the row
+    # offset each one starts at (plus the row count) to slice views by date.
+    # built once as the chain is read, and kept with it for all of its views
+    expirations = option_data["expiration_date"].values
+    starts = np.flatnonzero(expirations[1:] != expirations[:-1]) + 1
+    expiries = pd.DatetimeIndex(option_data["expiration_date"].iloc[np.r_[0, starts]])
+    return expiries, np.r_[0, starts, len(expirations)]
+
+
+def expiry_rows(expiry_index, first=None, last=None):
+    # [start, end) rows of the chain expiring from first through last
+    expiries, offsets = expiry_index
+    lo = 0 if first is None else expiries.searchsorted(first, side="left")
+    hi = len(expiries) if last is None else expiries.searchsorted(last, side="right")
+    return lo, max(lo, hi)
+
+
+def slice_expiries(option_data, expiry_index, first=None, last=None):
+    # contiguous view of the chain and its index, found with two binary searches
+    expiries, offsets = expiry_index
+    lo, hi = expiry_rows(expiry_index, first, last)
+    return option_data.iloc[offsets[lo] : offsets[hi]], (
+        expiries[lo:hi],
+        offsets[lo : hi + 1] - offsets[lo],
+    )
+
+
+def select_view(option_data, expiry_index, expir, today_ddt, tz):
+    all_dates = expiry_index[0]
+    first_expiry = all_dates[0]
+    if today_ddt > first_expiry:
+        # first date expired so, if available, use next date as 0DTE
+        try:
+            first_expiry = all_dates[1]
+        except IndexError:
+            print("next date unavailable. using expired date")
+
+    this_monthly_opex, month_end = sessions.monthly_opex(first_expiry, tz)
+
+    last = {
+        "monthly": month_end,
+        "0dte": first_expiry,
+        "opex": this_monthly_opex,
+    }.get(expir)
+    option_data, expiry_index = slice_expiries(
+        option_data, expiry_index, first_expiry, last
+    )
+    return option_data, expiry_index, first_expiry, this_monthly_opex
+
+
 def calc_exposures(
     option_data,
+    expiry_index,
     ticker,
     expir,
     first_expiry,
@@ -126,12 +231,11 @@ def calc_exposures(
     today_ddt_string,
 ):
     dividend_yield = 0.0  # assume 0
-    yield_10yr = check_ten_yr(today_ddt)
+    yield_10yr = risk_free_rate()
 
     monthly_options_dates = [first_expiry, this_monthly_opex]
 
     strike_prices = option_data["strike_price"].to_numpy()
-    expirations = option_data["expiration_date"].to_numpy()
     time_till_exp = option_data["time_till_exp"].to_numpy()
     opt_call_ivs = option_data["call_iv"].to_numpy()
     opt_put_ivs = option_data["put_iv"].to_numpy()
@@ -254,30 +358,6 @@ def calc_exposures(
         option_data["call_cex"].to_numpy() - option_data["put_cex"].to_numpy()
     ) / 10**9
 
-    # group all options by strike / expiration then average their IVs
-    df_agg_strike_mean = (
-        option_data[["strike_price", "call_iv", "put_iv"]]
-        .groupby(["strike_price"])
-        .mean(numeric_only=True)
-    )
-    df_agg_exp_mean = (
-        option_data[["expiration_date", "call_iv", "put_iv"]]
-        .groupby(["expiration_date"])
-        .mean(numeric_only=True)
-    )
-    # filter strikes / expirations for relevance
-    df_agg_strike_mean = df_agg_strike_mean[from_strike:to_strike]
-    # df_agg_exp_mean = df_agg_exp_mean[: today_ddt + timedelta(weeks=52)]
-
-    call_ivs = {
-        "strike": df_agg_strike_mean["call_iv"].to_numpy(),
-        "exp": df_agg_exp_mean["call_iv"].to_numpy(),
-    }
-    put_ivs = {
-        "strike": df_agg_strike_mean["put_iv"].to_numpy(),
-        "exp": df_agg_exp_mean["put_iv"].to_numpy(),
-    }
-
     # ---=== CALCULATE EXPOSURE PROFILES ===---
     levels = np.linspace(from_strike, to_strike, 300).reshape(-1, 1)
 
@@ -435,43 +515,47 @@ def calc_exposures(
     # charm exposure
     totalcharm["all"] = (call_charm_ex.sum(axis=1) - put_charm_ex.sum(axis=1)) / 10**9
 
-    expirs_next_expiry = expirations == first_expiry
-    expirs_up_to_monthly_opex = expirations <= this_monthly_opex
+    # contracts of the next expiry / up to monthly opex are contiguous columns
+    _, offsets = expiry_index
+    lo, hi = expiry_rows(expiry_index, first_expiry, first_expiry)
+    expirs_next_expiry = slice(offsets[lo], offsets[hi])
+    _, hi = expiry_rows(expiry_index, last=this_monthly_opex)
+    expirs_up_to_monthly_opex = slice(0, offsets[hi])
     if expir != "0dte":
         # exposure for next expiry
         totaldelta["ex_next"] = (
-            np.where(expirs_next_expiry, call_delta_ex, 0).sum(axis=1)
-            + np.where(expirs_next_expiry, put_delta_ex, 0).sum(axis=1)
+            call_delta_ex[:, expirs_next_expiry].sum(axis=1)
+            + put_delta_ex[:, expirs_next_expiry].sum(axis=1)
         ) / 10**9
         totalgamma["ex_next"] = (
-            np.where(expirs_next_expiry, call_gamma_ex, 0).sum(axis=1)
-            - np.where(expirs_next_expiry, put_gamma_ex, 0).sum(axis=1)
+            call_gamma_ex[:, expirs_next_expiry].sum(axis=1)
+            - put_gamma_ex[:, expirs_next_expiry].sum(axis=1)
         ) / 10**9
         totalvanna["ex_next"] = (
-            np.where(expirs_next_expiry, call_vanna_ex, 0).sum(axis=1)
-            - np.where(expirs_next_expiry, put_vanna_ex, 0).sum(axis=1)
+            call_vanna_ex[:, expirs_next_expiry].sum(axis=1)
+            - put_vanna_ex[:, expirs_next_expiry].sum(axis=1)
         ) / 10**9
         totalcharm["ex_next"] = (
-            np.where(expirs_next_expiry, call_charm_ex, 0).sum(axis=1)
-            - np.where(expirs_next_expiry, put_charm_ex, 0).sum(axis=1)
+            call_charm_ex[:, expirs_next_expiry].sum(axis=1)
+            - put_charm_ex[:, expirs_next_expiry].sum(axis=1)
         ) / 10**9
         if expir == "all":
             # exposure for next monthly opex
             totaldelta["ex_fri"] = (
-                np.where(expirs_up_to_monthly_opex, call_delta_ex, 0).sum(axis=1)
-                + np.where(expirs_up_to_monthly_opex, put_delta_ex, 0).sum(axis=1)
+                call_delta_ex[:, expirs_up_to_monthly_opex].sum(axis=1)
+                + put_delta_ex[:, expirs_up_to_monthly_opex].sum(axis=1)
             ) / 10**9
             totalgamma["ex_fri"] = (
-                np.where(expirs_up_to_monthly_opex, call_gamma_ex, 0).sum(axis=1)
-                - np.where(expirs_up_to_monthly_opex, put_gamma_ex, 0).sum(axis=1)
+                call_gamma_ex[:, expirs_up_to_monthly_opex].sum(axis=1)
+                - put_gamma_ex[:, expirs_up_to_monthly_opex].sum(axis=1)
             ) / 10**9
             totalvanna["ex_fri"] = (
-                np.where(expirs_up_to_monthly_opex, call_vanna_ex, 0).sum(axis=1)
-                - np.where(expirs_up_to_monthly_opex, put_vanna_ex, 0).sum(axis=1)
+                call_vanna_ex[:, expirs_up_to_monthly_opex].sum(axis=1)
+                - put_vanna_ex[:, expirs_up_to_monthly_opex].sum(axis=1)
             ) / 10**9
             totalcharm["ex_fri"] = (
-                np.where(expirs_up_to_monthly_opex, call_charm_ex, 0).sum(axis=1)
-                - np.where(expirs_up_to_monthly_opex, put_charm_ex, 0).sum(axis=1)
+                call_charm_ex[:, expirs_up_to_monthly_opex].sum(axis=1)
+                - put_charm_ex[:, expirs_up_to_monthly_opex].sum(axis=1)
             ) / 10**9
 
     # Find Delta Flip Point
@@ -505,7 +589,7 @@ def calc_exposures(
         print("gamma flip not found for", ticker, expir)
 
     return (
-        option_data,
+        exposure_cube(option_data, from_strike, to_strike),
         today_ddt,
         today_ddt_string,
         monthly_options_dates,
@@ -519,25 +603,13 @@ def calc_exposures(
         totalcharm,
         zerodelta,
         zerogamma,
-        call_ivs,
-        put_ivs,
     )
 
 
-def get_options_data_json(ticker, expir, tz):
-    try:
-        # CBOE file format, json
-        with open(
-            Path(f"{getcwd()}/data/json/{ticker}_quotedata.json"), encoding="utf-8"
-        ) as json_file:
-            json_data = json_file.read()
-        data = pd.json_normalize(orjson.loads(json_data))
-    except orjson.JSONDecodeError as e:  # handle error if data unavailable
-        print(f"{e}, {ticker} {expir} data is unavailable")
-        return
-
+def read_chain_json(payload, tz):
+    # CBOE json snapshot, already parsed
     # Get Spot
-    spot_price = data["data.current_price"][0].astype(float)
+    spot_price = float(payload["data"]["current_price"])
 
     # Get Today's Date
     today_date = DateDataParser(
@@ -546,106 +618,74 @@ def get_options_data_json(ticker, expir, tz):
             "TO_TIMEZONE": tz,
             "RETURN_AS_TIMEZONE_AWARE": True,
         }
-    ).get_date_data(str(data["timestamp"][0]))
+    ).get_date_data(str(payload["timestamp"]))
     # Handle date formats
     today_ddt = today_date.date_obj - timedelta(minutes=15)
     today_ddt_string = today_ddt.strftime("%Y %b %d, %I:%M %p %Z") + " (15min delay)"
 
     option_data = format_data(
-        data["data.options"][0],
+        payload["data"]["options"],
         today_ddt,
         today_date.date_obj.tzinfo,
     )
 
-    all_dates = option_data["expiration_date"].drop_duplicates()
-    first_expiry = all_dates.iat[0]
-    if today_ddt > first_expiry:
-        # first date expired so, if available, use next date as 0DTE
-        try:
-            option_data = option_data[option_data["expiration_date"] != first_expiry]
-            first_expiry = all_dates.iat[1]
-        except IndexError:
-            print("next date unavailable. using expired date")
-
-    this_monthly_opex, calendar_range = is_third_friday(first_expiry, tz)
-
-    if expir == "monthly":
-        option_data = option_data[
-            option_data["expiration_date"]
-            <= (calendar_range[-1].replace(tzinfo=ZoneInfo(tz)) + timedelta(hours=16))
-        ]
-    elif expir == "0dte":
-        option_data = option_data[option_data["expiration_date"] == first_expiry]
-    elif expir == "opex":
-        option_data = option_data[option_data["expiration_date"] <= this_monthly_opex]
-
-    return calc_exposures(
+    return (
         option_data,
-        ticker,
-        expir,
-        first_expiry,
-        this_monthly_opex,
         spot_price,
         today_ddt,
         today_ddt_string,
+        index_expiries(option_data),
+    )
+
+
+def read_chain_csv(csv_file, tz):
+    # CBOE csv snapshot, from an open text file or buffer
+    next(csv_file)  # skip first line
+    spot_line = csv_file.readline()
+    date_line = csv_file.readline()
+    # Option data starts at line 4
+    option_data = pd.read_csv(
+        csv_file,
+        header=0,
+        names=[
+            "expiration_date",
+            "calls",
+            "call_last_sale",
+            "call_net",
+            "call_bid",
+            "call_ask",
+            "call_vol",
+            "call_iv",
+            "call_delta",
+            "call_gamma",
+            "call_open_int",
+            "strike_price",
+            "puts",
+            "put_last_sale",
+            "put_net",
+            "put_bid",
+            "put_ask",
+            "put_vol",
+            "put_iv",
+            "put_delta",
+            "put_gamma",
+            "put_open_int",
+        ],
+        usecols=lambda x: x
+        not in [
+            "call_last_sale",
+            "call_net",
+            "call_bid",
+            "call_ask",
+            "call_vol",
+            "put_last_sale",
+            "put_net",
+            "put_bid",
+            "put_ask",
+            "put_vol",
+        ],
     )
 
-
-def get_options_data_csv(ticker, expir, tz):
-    try:
-        # CBOE file format, csv
-        with open(
-            Path(f"{getcwd()}/data/csv/{ticker}_quotedata.csv"), encoding="utf-8"
-        ) as csv_file:
-            next(csv_file)  # skip first line
-            spot_line = csv_file.readline()
-            date_line = csv_file.readline()
-            # Option data starts at line 4
-            option_data = pd.read_csv(
-                csv_file,
-                header=0,
-                names=[
-                    "expiration_date",
-                    "calls",
-                    "call_last_sale",
-                    "call_net",
-                    "call_bid",
-                    "call_ask",
-                    "call_vol",
-                    "call_iv",
-                    "call_delta",
-                    "call_gamma",
-                    "call_open_int",
-                    "strike_price",
-                    "puts",
-                    "put_last_sale",
-                    "put_net",
-                    "put_bid",
-                    "put_ask",
-                    "put_vol",
-                    "put_iv",
-                    "put_delta",
-                    "put_gamma",
-                    "put_open_int",
-                ],
-                usecols=lambda x: x
-                not in [
-                    "call_last_sale",
-                    "call_net",
-                    "call_bid",
-                    "call_ask",
-                    "call_vol",
-                    "put_last_sale",
-                    "put_net",
-                    "put_bid",
-                    "put_ask",
-                    "put_vol",
-                ],
-            )
-    except:  # handle error if data unavailable
-        print(ticker, expir, "data is unavailable")
-        return
-
     # Get Spot
     spot_price = float(spot_line.split("Last:")[1].split(",")[0])
 
@@ -675,39 +715,71 @@ def get_options_data_csv(ticker, expir, tz):
     option_data["call_open_int"] = option_data["call_open_int"].astype(float)
     option_data["put_open_int"] = option_data["put_open_int"].astype(float)
 
-    all_dates = option_data["expiration_date"].drop_duplicates()
-    first_expiry = all_dates.iat[0]
-    if today_ddt > first_expiry:
-        # first date expired so, if available, use next date as 0DTE
-        try:
-            option_data = option_data[option_data["expiration_date"] != first_expiry]
-            first_expiry = all_dates.iat[1]
-        except IndexError:
-            print("next date unavailable. using expired date")
-    this_monthly_opex, calendar_range = is_third_friday(first_expiry, tz)
-
-    busday_counts = np.busday_count(
+    busday_counts = sessions.busday_count(
         today_ddt.date(),
         option_data["expiration_date"].values.astype("datetime64[D]"),
     )
     # set DTE. 0DTE options are included in 1 day expirations
-    # time to expiration in years (252 trading days)
+    # time to expiration in years (252 trading days), skipping exchange holidays
     option_data["time_till_exp"] = np.where(
         busday_counts == 0, 1 / 252, busday_counts / 252
     )
+    option_data = option_data.sort_values(
+        by=["expiration_date", "strike_price"]
+    ).reset_index(drop=True)
+
+    return (
+        option_data,
+        spot_price,
+        today_ddt,
+        today_ddt_string,
+        index_expiries(option_data),
+    )
 
-    if expir == "monthly":
-        option_data = option_data[
-            option_data["expiration_date"]
-            <= (calendar_range[-1].replace(tzinfo=ZoneInfo(tz)) + timedelta(hours=16))
-        ]
-    elif expir == "0dte":
-        option_data = option_data[option_data["expiration_date"] == first_expiry]
-    elif expir == "opex":
-        option_data = option_data[option_data["expiration_date"] <= this_monthly_opex]
+
+def load_chain(ticker, is_json, tz):
+    # stored snapshot of a ticker, as written by the last download
+    if is_json:
+        try:
+            # CBOE file format, json
+            with open(
+                Path(f"{getcwd()}/data/json/{ticker}_quotedata.json"), "rb"
+            ) as json_file:
+                return read_chain_json(orjson.loads(json_file.read()), tz)
+        except (OSError, orjson.JSONDecodeError) as e:  # data unavailable
+            print(f"{e}, {ticker} data is unavailable")
+            return
+    try:
+        # CBOE file format, csv
+        with open(
+            Path(f"{getcwd()}/data/csv/{ticker}_quotedata.csv"), encoding="utf-8"
+        ) as csv_file:
+            return read_chain_csv(csv_file, tz)
+    except:  # handle error if data unavailable
+        print(ticker, "data is unavailable")
+        return
+
+
+def read_chain(snapshot, is_json, tz):
+    # snapshot handed over by the downloader: parsed json payload or decoded
+    # csv bytes, read without going back to disk
+    if is_json:
+        return read_chain_json(snapshot, tz)
+    return read_chain_csv(TextIOWrapper(BytesIO(snapshot), encoding="utf-8"), tz)
+
+
+def analyze_chain(chain, ticker, expir, tz):
+    # one expiration view of a parsed chain. the chain itself is left as is,
+    # so all views of a snapshot can be computed from a single parse
+    option_data, spot_price, today_ddt, today_ddt_string, expiry_index = chain
+
+    option_data, expiry_index, first_expiry, this_monthly_opex = select_view(
+        option_data, expiry_index, expir, today_ddt, tz
+    )
 
     return calc_exposures(
-        option_data,
+        option_data.copy(),  # exposures are added to the view, not the chain
+        expiry_index,
         ticker,
         expir,
         first_expiry,
@@ -719,8 +791,5 @@ def get_options_data_csv(ticker, expir, tz):
 
 
 def get_options_data(ticker, expir, is_json, tz):
-    return (
-        get_options_data_json(ticker, expir, tz)
-        if is_json
-        else get_options_data_csv(ticker, expir, tz)
-    )
+    chain = load_chain(ticker, is_json, tz)
+    return analyze_chain(chain, ticker, expir, tz) if chain else None
@@ -0,0 +1,555 @@
+import plotly.graph_objects as go
+import plotly.io as pio
+import orjson
+import textwrap
+import threading
+from plotly.subplots import make_subplots
+from cachetools import LRUCache
+from datetime import timedelta
+from hashlib import blake2b
+from os import environ
+from string import hexdigits
+from dash import Patch
+from modules.calc import exposure_grid
+from modules.ticker_dwn import write_atomic
+from modules.results import (
+    cache_data,
+    expirations,
+    figures_dir,
+    generation,
+    get_published,
+    is_known,
+    single_flight,
+)
+
+# a view's figure is the same for everyone until the next generation, so it
+# is rendered once, serialized, and shared by every worker through
+# data/figures. each worker keeps the figures it served last in memory
+_rendered = LRUCache(
+    maxsize=int(environ.get("FIGURE_CACHE_MB") or 32) * 2**20, getsizeof=len
+)
+_rendered_lock = threading.Lock()
+# partial updates between two views, the same for every client moving from
+# one to the other, so each worker works out each only once
+_patches = LRUCache(maxsize=128)
+# the view each tab opens on, rendered as soon as a ticker is published
+prerender_views = (
+    [("Absolute Delta Exposure", 1)] if environ.get("PRERENDER") != "0" else []
+)
+
+
+def theme(dark):
+    # layout and axes of the light or dark theme, new for each chart
+    xaxis, yaxis = dict(
+        gridcolor="lightgray", minor=dict(ticklen=5, tickcolor="#000", showgrid=True)
+    ), dict(gridcolor="lightgray", minor=dict(tickcolor="#000"))
+    layout = {
+        "title_x": 0.5,
+        "title_font_size": 12.5,
+        "title_xref": "paper",
+        "legend": dict(
+            orientation="v",
+            yanchor="top",
+            xanchor="right",
+            y=0.98,
+            x=0.98,
+            bgcolor="rgba(0,0,0,0.1)",
+            font_size=10,
+        ),
+        "showlegend": True,
+        "margin": dict(l=0, r=40),
+        "xaxis": xaxis,
+        "yaxis": yaxis,
+        "dragmode": "pan",
+    }
+    if dark:
+        for axis in [xaxis, yaxis]:
+            axis["gridcolor"], axis["minor"]["tickcolor"] = "#373737", "#707070"
+        layout["paper_bgcolor"] = "#222222"
+        layout["plot_bgcolor"] = "rgba(40, 40, 50, 0.8)"
+    return layout, xaxis, yaxis
+
+
+def theme_template(dark):
+    template = go.layout.Template(pio.templates["plotly_dark" if dark else "seaborn"])
+    template.update(layout=theme(dark)[0])
+    return template
+
+
+# each theme's template is built once and given to its charts, rather than
+# made plotly's global default on every render, which other threads rendering
+# at the same time would see
+templates = {dark: theme_template(dark) for dark in [False, True]}
+_line_colors = {False: ("#2B5078", "#9B5C30"), True: ("#8795FA", "#F5765B")}
+
+
+def is_single_page(value):
+    # profiles and heatmaps have no by-date page
+    return "Profile" in value or "Heatmap" in value
+
+
+def render_chart(data, value, stock, expiration, active_page, toggle_dark):
+    (
+        cube,
+        today_ddt,
+        today_ddt_string,
+        monthly_options_dates,
+        spot_price,
+        from_strike,
+        to_strike,
+        levels,
+        totaldelta,
+        totalgamma,
+        totalvanna,
+        totalcharm,
+        zerodelta,
+        zerogamma,
+    ) = data
+
+    # chart theme and layout
+    _, xaxis, yaxis = theme(toggle_dark)
+    line_colors = _line_colors[toggle_dark]
+
+    if cube is None:
+        return go.Figure(
+            layout={
+                "title_text": f"{stock} data unavailable, retry later",
+                "template": templates[toggle_dark],
+            }
+        )
+
+    date_condition = active_page == 2 and not is_single_page(value)
+    # aggregates by strike or by date are slices of the snapshot's cube
+    df_agg = cube["strike"] if not date_condition else cube["exp"]
+    call_ivs, put_ivs = df_agg["call_iv"].to_numpy(), df_agg["put_iv"].to_numpy()
+
+    date_formats = {
+        "monthly": monthly_options_dates[0].strftime("%Y %b"),
+        "opex": monthly_options_dates[1].strftime("%Y %b %d"),
+        "0dte": monthly_options_dates[0].strftime("%Y %b %d"),
+    }
+    legend_title = (
+        date_formats[expiration] if expiration != "all" else "All Expirations"
+    )
+
+    strikes = df_agg.index.to_numpy()
+
+    is_profile_or_volatility = "Profile" in value or "Average" in value
+    name = value.split()[1] if "Absolute" in value else value.split()[0]
+
+    name_to_vals = {
+        "Delta": (
+            f"per 1% {stock} Move",
+            f"{name} Exposure (price / 1% move)",
+            zerodelta,
+        ),
+        "Gamma": (
+            f"per 1% {stock} Move",
+            f"{name} Exposure (delta / 1% move)",
+            zerogamma,
+        ),
+        "Vanna": (
+            f"per 1% {stock} IV Move",
+            f"{name} Exposure (delta / 1% IV move)",
+            0,
+        ),
+        "Charm": (
+            f"a day til {stock} Expiry",
+            f"{name} Exposure (delta / day til expiry)",
+            0,
+        ),
+        "Implied": ("", "Implied Volatility (IV) Average", 0),
+    }
+
+    description, y_title, zeroflip = name_to_vals[name]
+    yaxis.update(title_text=y_title)
+    scale = 10**9
+
+    if "Absolute" in value:
+        fig = go.Figure(
+            data=[
+                go.Bar(
+                    name=name + " Exposure",
+                    x=strikes,
+                    y=df_agg[f"total_{name.lower()}"].to_numpy(),
+                    marker=dict(
+                        line=dict(
+                            width=0.25,
+                            color=line_colors[0],
+                        ),
+                    ),
+                )
+            ]
+        )
+    elif "Calls/Puts" in value:
+        fig = go.Figure(
+            data=[
+                go.Bar(
+                    name="Call " + name,
+                    x=strikes,
+                    y=df_agg[f"call_{name[:1].lower()}ex"].to_numpy() / scale,
+                    marker=dict(
+                        line=dict(
+                            width=0.25,
+                            color=line_colors[0],
+                        ),
+                    ),
+                ),
+                go.Bar(
+                    name="Put " + name,
+                    x=strikes,
+                    y=df_agg[f"put_{name[:1].lower()}ex"].to_numpy() / scale,
+                    marker=dict(
+                        line=dict(
+                            width=0.25,
+                            color=line_colors[1],
+                        ),
+                    ),
+                ),
+            ]
+        )
+    elif "Heatmap" in value:
+        expiries, _, grid = exposure_grid(cube, f"total_{name.lower()}")
+        fig = go.Figure(
+            data=[
+                go.Heatmap(
+                    name=name + " Exposure",
+                    x=strikes,
+                    y=expiries,
+                    z=grid,
+                    colorscale="RdBu",
+                    zmid=0,
+                    colorbar=dict(title=dict(text=y_title, side="right")),
+                    hoverongaps=False,
+                )
+            ]
+        )
+        yaxis.update(title_text="Date")
+
+    if not is_profile_or_volatility:
+        split_title = textwrap.wrap(
+            f"Total {name}: $"
+            + str("{:,.2f}".format(cube["total"][f"total_{name.lower()}"] * scale))
+            + f" {description}, {today_ddt_string}",
+            width=50,
+        )
+        fig.update_layout(  # bar chart layout
+            title_text="<br>".join(split_title),
+            legend_title_text=legend_title,
+            xaxis=xaxis,
+            yaxis=yaxis,
+            barmode="relative",
+            modebar_remove=["autoscale", "lasso2d"],
+        )
+    if is_profile_or_volatility:
+        fig = make_subplots(rows=1, cols=1)
+        if not date_condition and name != "Implied":  # chart profiles
+            split_title = textwrap.wrap(
+                f"{stock} {name} Exposure Profile, {today_ddt_string}", width=50
+            )
+            name_to_vals = {
+                "Delta": (
+                    totaldelta["all"],
+                    totaldelta["ex_next"],
+                    totaldelta["ex_fri"],
+                ),
+                "Gamma": (
+                    totalgamma["all"],
+                    totalgamma["ex_next"],
+                    totalgamma["ex_fri"],
+                ),
+                "Vanna": (
+                    totalvanna["all"],
+                    totalvanna["ex_next"],
+                    totalvanna["ex_fri"],
+                ),
+                "Charm": (
+                    totalcharm["all"],
+                    totalcharm["ex_next"],
+                    totalcharm["ex_fri"],
+                ),
+            }
+            all_ex, ex_next, ex_fri = name_to_vals[name]
+            fig.add_trace(go.Scatter(x=levels, y=all_ex, name="All Expiries"))
+            fig.add_trace(go.Scatter(x=levels, y=ex_fri, name="Next Monthly Expiry"))
+            fig.add_trace(go.Scatter(x=levels, y=ex_next, name="Next Expiry"))
+            # show - &/or + areas of exposure depending on condition
+            if name == "Charm" or name == "Vanna":
+                all_ex_min, all_ex_max = all_ex.min(), all_ex.max()
+                min_n = [
+                    all_ex_min,
+                    ex_fri.min() if ex_fri.size != 0 else all_ex_min,
+                    ex_next.min() if ex_next.size != 0 else all_ex_min,
+                ]
+                max_n = [
+                    all_ex_max,
+                    ex_fri.max() if ex_fri.size != 0 else all_ex_max,
+                    ex_next.max() if ex_next.size != 0 else all_ex_max,
+                ]
+                min_n.sort()
+                max_n.sort()
+                if min_n[0] < 0:
+                    fig.add_hrect(
+                        y0=0,
+                        y1=min_n[0] * 1.5,
+                        fillcolor="red",
+                        opacity=0.1,
+                        line_width=0,
+                    )
+                if max_n[2] > 0:
+                    fig.add_hrect(
+                        y0=0,
+                        y1=max_n[2] * 1.5,
+                        fillcolor="green",
+                        opacity=0.1,
+                        line_width=0,
+                    )
+                fig.add_hline(
+                    y=0,
+                    line_width=0,
+                    name=name + " Flip",
+                    annotation_text=name + " Flip",
+                    annotation_position="top left",
+                )
+            # greek has a - to + flip
+            elif zeroflip > 0:
+                fig.add_vline(
+                    x=zeroflip,
+                    line_color="dimgray",
+                    line_width=1,
+                    name=name + " Flip",
+                    annotation_text=name + " Flip: " + str("{:,.0f}".format(zeroflip)),
+                    annotation_position="top left",
+                )
+                fig.add_vrect(
+                    x0=from_strike,
+                    x1=zeroflip,
+                    fillcolor="red",
+                    opacity=0.1,
+                    line_width=0,
+                )
+                fig.add_vrect(
+                    x0=zeroflip,
+                    x1=to_strike,
+                    fillcolor="green",
+                    opacity=0.1,
+                    line_width=0,
+                )
+            # flip unknown, assume - dominance
+            elif all_ex[0] < 0:
+                fig.add_vrect(
+                    x0=from_strike,
+                    x1=to_strike,
+                    fillcolor="red",
+                    opacity=0.1,
+                    line_width=0,
+                )
+            # flip unknown, assume + dominance
+            elif all_ex[0] > 0:
+                fig.add_vrect(
+                    x0=from_strike,
+                    x1=to_strike,
+                    fillcolor="green",
+                    opacity=0.1,
+                    line_width=0,
+                )
+        elif name == "Implied":  # in IV section, chart put/call IV averages
+            fig.add_trace(
+                go.Scatter(
+                    x=strikes,
+                    y=put_ivs * 100,
+                    name="Put IV",
+                    fill="tozeroy",
+                    line_color="#C44E52",
+                )
+            )
+            fig.add_trace(
+                go.Scatter(
+                    x=strikes,
+                    y=call_ivs * 100,
+                    name="Call IV",
+                    fill="tozeroy",
+                    line_color="#32A3A3",
+                )
+            )
+            split_title = textwrap.wrap(
+                f"{stock} IV Average, {today_ddt_string}", width=50
+            )
+        fig.add_hline(
+            y=0,
+            line_width=1,
+            line_color="dimgray",
+        )
+        fig.update_layout(  # scatter chart layout
+            title_text="<br>".join(split_title),
+            legend_title_text=legend_title,
+            xaxis=xaxis,
+            yaxis=yaxis,
+            modebar_remove=["autoscale"],
+        )
+
+    fig.update_xaxes(
+        title="Strike" if not date_condition else "Date",
+        showgrid=True,
+        range=(
+            [spot_price * 0.9, spot_price * 1.1]
+            if not date_condition
+            else (
+                [
+                    strikes[0] - timedelta(seconds=0.0625),
+                    strikes[0] + timedelta(seconds=0.0625),
+                ]
+                if len(strikes) == 1
+                else [today_ddt, today_ddt + timedelta(days=31)]
+            )
+        ),
+        gridwidth=1,
+        rangeslider=dict(visible=True),
+    )
+    fig.update_yaxes(
+        showgrid=True,
+        fixedrange=True,
+        minor_ticks="inside",
+        gridwidth=1,
+    )
+
+    if not date_condition:
+        fig.add_vline(
+            x=spot_price,
+            line_color="#707070",
+            line_width=1,
+            line_dash="dash",
+            name=stock + " Spot",
+            annotation_text="Last: " + str("{:,.2f}".format(spot_price)),
+            annotation_position="top",
+        )
+
+    fig.update_layout(template=templates[toggle_dark])
+    return fig
+
+
+def chart_view(expiration, value, active_page, toggle_dark):
+    # any page but the by-date one renders the by-strike page
+    active_page = 2 if active_page == 2 and not is_single_page(value) else 1
+    return f"{expiration}_{value}_{active_page}_{'dark' if toggle_dark else 'light'}"
+
+
+def figure_file(ticker, gen, view):
+    name = f"{blake2b(view.encode(), digest_size=16).hexdigest()}.json"
+    return figures_dir(ticker, gen) / name
+
+
+def cached_figure(ticker, gen, view):
+    # serialized figure of a view from a generation, if any worker rendered it.
+    # the generation may come from the client, and names a directory
+    if not is_known(ticker) or not (
+        isinstance(gen, str) and gen and all(c in hexdigits for c in gen)
+    ):
+        return None
+    with _rendered_lock:
+        fig = _rendered.get((ticker, gen, view))
+    if fig is None:
+        try:
+            fig = figure_file(ticker, gen, view).read_bytes()
+        except FileNotFoundError:
+            return None
+        with _rendered_lock:
+            _rendered[(ticker, gen, view)] = fig
+    return fig
+
+
+def rendered(ticker, gen, view, render):
+    # serialized figure of a view from a generation, rendered if no worker
+    # has yet
+    fig = cached_figure(ticker, gen, view)
+    if fig is not None:
+        return fig
+    stored = figure_file(ticker, gen, view)
+    with single_flight("figure", f"{ticker}_{stored.stem}"):
+        fig = cached_figure(ticker, gen, view)  # rendered while waiting
+        if fig is not None:
+            return fig
+        fig = render().to_json().encode()
+        if generation(ticker) == gen:  # else moved on, and removed
+            try:
+                stored.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(stored, fig)
+            except OSError as e:
+                print(f"{e}, storing {view} figure failed")
+    with _rendered_lock:
+        _rendered[(ticker, gen, view)] = fig
+    return fig
+
+
+def get_figure(stock, expiration, value, active_page, toggle_dark, gen=None):
+    # serialized figure of a view, from the given generation or the current
+    # one. it is sent to the client as it is, see app
+    ticker = stock.lower()
+    render = lambda data: render_chart(
+        data,
+        value,
+        stock,
+        expiration,
+        1 if is_single_page(value) else active_page,
+        toggle_dark,
+    )
+    gen = gen or generation(ticker)
+    data = None
+    if gen is not None and is_known(ticker, expiration):
+        # rendered from the generation it is stored under, even if a newer
+        # one is published meanwhile
+        data = get_published(ticker, expiration, "result", gen)
+    if data is None:
+        # computed on demand, unknown, or its generation gone: nothing to key
+        # it by
+        return render(cache_data(ticker, expiration)).to_json().encode()
+    view = chart_view(expiration, value, active_page, toggle_dark)
+    return rendered(ticker, gen, view, lambda: render(data))
+
+
+def figure_patch(old, new):
+    # the properties of figure `new` that differ from `old`, as a partial
+    # update of the client's figure, or None if the traces differ in kind
+    if [trace.get("type") for trace in old["data"]] != [
+        trace.get("type") for trace in new["data"]
+    ]:
+        return None
+    patched = Patch()
+    parts = [(patched["layout"], old["layout"], new["layout"])] + [
+        (patched["data"][i], was, now)
+        for i, (was, now) in enumerate(zip(old["data"], new["data"]))
+    ]
+    for part, was, now in parts:
+        for key in was.keys() - now.keys():
+            del part[key]
+        for key, value in now.items():
+            if was.get(key) != value:
+                part[key] = value
+    return patched
+
+
+def figure_update(ticker, shown, gen, view):
+    # partial update of the figure a client shows to the view of a generation,
+    # or None to send the whole figure
+    key = (ticker, shown["data"]["generation"], shown["view"], gen, view)
+    with _rendered_lock:
+        if key in _patches:
+            return _patches[key]
+    old = cached_figure(ticker, key[1], key[2])
+    new = cached_figure(ticker, gen, view)
+    if old is None or new is None:
+        return None
+    patched = figure_patch(orjson.loads(old), orjson.loads(new))
+    with _rendered_lock:
+        _patches[key] = patched
+    return patched
+
+
+def prerender(ticker):
+    # the views opened most, rendered once a ticker is published
+    if generation(ticker) is None:
+        return  # nothing published to render from
+    for expir in expirations:
+        for value, active_page in prerender_views:
+            for toggle_dark in [False, True]:
+                get_figure(ticker.upper(), expir, value, active_page, toggle_dark)
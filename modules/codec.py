@@ -0,0 +1,228 @@
+import pandas as pd
+import numpy as np
+import orjson
+import pytz
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+# exposure results stored as a small zlib compressed json header followed by
+# the raw array buffers, each aligned to its element size. decoding builds
+# dataframes around read-only views of the stored bytes, a column each,
+# rather than copying them the way unpickling does. buffers can also be
+# byte-shuffled and zlib compressed, trading decode time for size
+_magic = b"GFX2"
+_align = 8  # widest element stored
+
+
+def _tz_spec(tz):
+    if tz is None:
+        return None
+    # pytz and zoneinfo zones both round trip as their own kind
+    return [str(tz), "pytz" if hasattr(tz, "localize") else "zoneinfo"]
+
+
+@lru_cache(maxsize=None)
+def _tz(name, kind):
+    return pytz.timezone(name) if kind == "pytz" else ZoneInfo(name)
+
+
+@lru_cache(maxsize=64)
+def _labels(labels, name):
+    # column names repeat across entries, and an index is immutable
+    return pd.Index(labels, dtype=object, name=name)
+
+
+def _array(value, buffers):
+    buffers.append(np.ascontiguousarray(value))
+    return {"t": "nd", "shape": value.shape, "buf": len(buffers) - 1}
+
+
+def _column(series):
+    # a column's values as stored: pandas arrays for extension dtypes
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        return series.array
+    return series.to_numpy()
+
+
+def _encode(value, buffers):
+    # header entry for a value, its arrays appended to buffers
+    if isinstance(value, pd.DataFrame):
+        if not value.columns.is_unique:
+            raise TypeError("cannot encode duplicate columns")
+        index = value.index
+        return {
+            "t": "df",
+            "columns": _encode(value.columns, buffers),
+            "index": (
+                {"t": "range", "range": [index.start, index.stop, index.step]}
+                if isinstance(index, pd.RangeIndex)
+                else _encode(index, buffers)
+            ),
+            "values": [
+                _encode(_column(series), buffers) for _, series in value.items()
+            ],
+        }
+    if isinstance(value, pd.Categorical):
+        return {
+            "t": "cat",
+            "codes": _array(value.codes, buffers),
+            "categories": _encode(value.categories, buffers),
+            "ordered": value.ordered,
+        }
+    if isinstance(value, (pd.DatetimeIndex, pd.arrays.DatetimeArray)):
+        index = pd.DatetimeIndex(value)
+        return {
+            "t": "datetimes",
+            "index": isinstance(value, pd.Index),
+            "name": index.name,
+            "tz": _tz_spec(index.tz),
+            # utc, as pandas holds them
+            "values": _array(index.tz_convert(None).to_numpy(), buffers),
+        }
+    if isinstance(value, pd.Index):
+        if value.dtype == object and all(isinstance(v, str) for v in value):
+            # column names
+            return {"t": "labels", "v": value.tolist(), "name": value.name}
+        return {
+            "t": "index",
+            "values": _encode(value.to_numpy(), buffers),
+            "name": value.name,
+        }
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return {"t": "list", "items": [_encode(v, buffers) for v in value]}
+        return _array(value, buffers)
+    if isinstance(value, pd.Timestamp):
+        return {"t": "ts", "i8": value.value, "tz": _tz_spec(value.tz)}
+    if isinstance(value, datetime):
+        return {"t": "dt", "iso": value.isoformat(), "tz": _tz_spec(value.tzinfo)}
+    if isinstance(value, (np.floating, np.integer, np.bool_)):
+        return {"t": "scalar", "dtype": value.dtype.str, "v": value.item()}
+    if isinstance(value, (tuple, list)):
+        return {
+            "t": type(value).__name__,
+            "items": [_encode(v, buffers) for v in value],
+        }
+    if isinstance(value, dict):
+        return {
+            "t": "dict",
+            "items": {k: _encode(v, buffers) for k, v in value.items()},
+        }
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return {"t": "v", "v": value}
+    raise TypeError(f"cannot encode {type(value).__name__}")
+
+
+def _decode(spec, arrays):
+    return _decoders[spec["t"]](spec, arrays)
+
+
+def _decode_frame(spec, arrays):
+    index = spec["index"]
+    index = (
+        pd.RangeIndex(*index["range"])
+        if index["t"] == "range"
+        else _decode(index, arrays)
+    )
+    columns = _decode(spec["columns"], arrays)
+    values = [_decode(column, arrays) for column in spec["values"]]
+    # a dict of arrays with copy=False keeps each column as it is, unconsolidated
+    frame = pd.DataFrame(dict(zip(columns, values)), index=index, copy=False)
+    frame.columns = columns
+    return frame
+
+
+def _decode_datetimes(spec, arrays):
+    values = pd.DatetimeIndex(_decode(spec["values"], arrays), name=spec["name"])
+    if spec["tz"]:
+        values = values.tz_localize("UTC").tz_convert(_tz(*spec["tz"]))
+    return values if spec["index"] else values.array
+
+
+def _decode_timestamp(spec, arrays):
+    return pd.Timestamp(spec["i8"], tz=_tz(*spec["tz"]) if spec["tz"] else None)
+
+
+def _decode_datetime(spec, arrays):
+    value = datetime.fromisoformat(spec["iso"])
+    return value.astimezone(_tz(*spec["tz"])) if spec["tz"] else value
+
+
+_decoders = {
+    "nd": lambda spec, arrays: arrays[spec["buf"]].reshape(spec["shape"]),
+    "df": _decode_frame,
+    "cat": lambda spec, arrays: pd.Categorical.from_codes(
+        _decode(spec["codes"], arrays),
+        dtype=pd.CategoricalDtype(_decode(spec["categories"], arrays), spec["ordered"]),
+        validate=False,  # codes were taken from a valid categorical
+    ),
+    "datetimes": _decode_datetimes,
+    "index": lambda spec, arrays: pd.Index(
+        _decode(spec["values"], arrays), name=spec["name"]
+    ),
+    "labels": lambda spec, arrays: _labels(tuple(spec["v"]), spec["name"]),
+    "ts": _decode_timestamp,
+    "dt": _decode_datetime,
+    "scalar": lambda spec, arrays: np.dtype(spec["dtype"]).type(spec["v"]),
+    "tuple": lambda spec, arrays: tuple(_decode(v, arrays) for v in spec["items"]),
+    "list": lambda spec, arrays: [_decode(v, arrays) for v in spec["items"]],
+    "dict": lambda spec, arrays: {
+        k: _decode(v, arrays) for k, v in spec["items"].items()
+    },
+    "v": lambda spec, arrays: spec["v"],
+}
+
+
+def encode(value, compress=False):
+    buffers = []
+    spec = _encode(value, buffers)
+    layout, chunks, offset = [], [], 0
+    for buf in buffers:
+        data = buf.reshape(-1).view(np.uint8)
+        if compress:
+            # bytes of equal significance side by side compress far better
+            data = zlib.compress(data.reshape(-1, buf.itemsize).T.tobytes(), level=1)
+        layout.append([buf.dtype.str, buf.size, offset, len(data)])
+        pad = -len(data) % _align
+        chunks += [data, bytes(pad)]
+        offset += len(data) + pad
+    header = zlib.compress(
+        orjson.dumps({"spec": spec, "buffers": layout, "compressed": compress})
+    )
+    start = len(_magic) + 4 + len(header)
+    return b"".join(
+        [
+            _magic,
+            len(header).to_bytes(4, "little"),
+            header,
+            bytes(-start % _align),
+            *chunks,
+        ]
+    )
+
+
+def decode(blob):
+    # the arrays of uncompressed entries are read-only views of `blob`
+    if blob[: len(_magic)] != _magic:
+        raise ValueError("not an encoded result")
+    size = int.from_bytes(blob[len(_magic) : len(_magic) + 4], "little")
+    start = len(_magic) + 4
+    header = orjson.loads(zlib.decompress(blob[start : start + size]))
+    base = start + size + (-(start + size) % _align)
+    arrays = []
+    for dtype, count, offset, length in header["buffers"]:
+        dtype = np.dtype(dtype)
+        if header["compressed"]:
+            shuffled = np.frombuffer(
+                zlib.decompress(blob[base + offset : base + offset + length]),
+                dtype=np.uint8,
+            )
+            array = shuffled.reshape(dtype.itemsize, count).T.copy().view(dtype)
+            arrays.append(array.reshape(-1))
+        else:
+            arrays.append(
+                np.frombuffer(blob, dtype=dtype, count=count, offset=base + offset)
+            )
+    return _decode(header["spec"], arrays)
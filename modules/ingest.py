@@ -0,0 +1,279 @@
+import threading
+import orjson
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.jobstores.base import JobLookupError
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from pathlib import Path
+from os import environ, getcwd, getpid, scandir
+from time import time_ns
+
+if __name__ == "__main__":
+    # run on its own: .env is loaded before the modules below read it on import
+    load_dotenv()
+
+from modules.sessions import ensure_table, session_at
+from modules.rates import refresh_rate
+from modules.ticker_info import refresh_ticker_info
+from modules.ticker_dwn import dwn_data, load_snapshots, save_snapshots, snapshot_hash
+from modules.results import publish, publish_stored
+from modules.charts import prerender
+
+try:
+    import fcntl
+except ImportError:  # windows, where the app runs as a single process
+    fcntl = None
+
+# exactly one process downloads and publishes: whichever holds this lock. run
+# it standalone with `python -m modules.ingest`, or let the web workers elect
+# one of themselves
+_lock_file = Path(f"{getcwd()}/data/ingest.lock")
+_lock = None
+# refresh cadence in minutes, see README for the matching env variables
+refresh_interval = float(environ.get("REFRESH_INTERVAL") or 15)
+max_interval = float(environ.get("REFRESH_MAX_INTERVAL") or 60)
+zero_dte_interval = float(environ.get("REFRESH_0DTE") or 0)  # 0: off
+edge = timedelta(minutes=30)  # after the open and before the close, for 0DTE
+after_close = timedelta(minutes=30)  # quotes are delayed 15 min past the close
+_unchanged = 0  # downloads in a row that brought no new data
+# tickers published with missing greeks are downloaded again after
+# retry_delay seconds, doubled after each attempt, up to retry_attempts times
+# until complete data arrives
+retry_delay = float(environ.get("RETRY_DELAY") or 30)
+retry_attempts = int(environ.get("RETRY_ATTEMPTS") or 4)
+_retries = {}  # ticker: attempts made
+_retries_lock = threading.Lock()
+_download_lock = threading.Lock()  # one download run at a time
+_sched = None
+# chain files dropped into data/json or data/csv are published within
+# watch_interval seconds, once they have been left alone for settle_time
+watch_interval = float(environ.get("WATCH_INTERVAL") or 5)  # 0: off
+settle_time = 1_000_000_000  # ns
+_watched = {}  # stored chain file: modification time when published
+
+
+def acquire_lock(blocking):
+    global _lock
+    if fcntl is None:
+        return True
+    lock = open(_lock_file, "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        lock.close()
+        return False
+    _lock = lock  # held, and released by the os, for the life of the process
+    return True
+
+
+def sensor(select=None):
+    # default: all tickers, json format
+    with _download_lock:
+        return dwn_data(select, is_json=True, publish=publish_checked)  # False for CSV
+
+
+def publish_checked(ticker, snapshot, is_json):
+    check_published(ticker, publish(ticker, snapshot, is_json))
+
+
+def check_published(ticker, complete):
+    # every publish, downloaded, dropped or stored, is retried while incomplete
+    prerender(ticker)
+    if complete:
+        with _retries_lock:
+            _retries.pop(ticker, None)
+        try:  # new complete data supersedes a pending retry
+            _sched.remove_job(f"retry_{ticker}")
+        except (AttributeError, JobLookupError):
+            pass
+    else:
+        queue_retry(ticker)
+
+
+def queue_retry(ticker):
+    # one pending retry per ticker, spaced out with exponential backoff
+    with _retries_lock:
+        attempts = _retries.get(ticker, 0)
+        if attempts >= retry_attempts:  # until complete data arrives
+            print(f"\n{ticker} still missing greek exposure, retries used up\n")
+            return
+        _retries[ticker] = attempts + 1
+    print(
+        f"\nmissing greek exposure, redownloading {ticker} (attempt {attempts + 1})\n"
+    )
+    _sched.add_job(
+        retry,
+        "date",
+        args=[ticker],
+        run_date=datetime.now() + timedelta(seconds=retry_delay * 2**attempts),
+        id=f"retry_{ticker}",
+        replace_existing=True,
+        misfire_grace_time=None,
+    )
+
+
+def retry(ticker):
+    if ticker.upper() not in sensor(select=[ticker.upper()]):
+        queue_retry(ticker)  # no new data yet
+
+
+def scan():
+    # stored chain files and their modification times
+    files = {}
+    for d_format in ["json", "csv"]:
+        try:
+            with scandir(f"{getcwd()}/data/{d_format}") as entries:
+                for entry in entries:
+                    if entry.name.endswith(f"_quotedata.{d_format}"):
+                        files[entry.path] = entry.stat().st_mtime_ns
+        except FileNotFoundError:
+            continue
+    return files
+
+
+def publish_dropped(path):
+    # publish a chain file that was not written by our own downloads
+    is_json = path.endswith(".json")
+    ticker = Path(path).name.split("_quotedata")[0]
+    key = f"{ticker}_{'json' if is_json else 'csv'}"
+    with open(path, "rb") as f:
+        data = f.read()
+    snapshot = orjson.loads(data) if is_json else data
+    digest = snapshot_hash(data, is_json, snapshot if is_json else None)
+    with _download_lock:
+        snapshots = load_snapshots()
+        if snapshots.get(key, {}).get("hash") == digest:
+            return  # downloaded, and published as it landed
+        print(f"\nnew {key} file, publishing {ticker}\n")
+        check_published(ticker, publish(ticker, snapshot, is_json))
+        snapshots[key] = {**snapshots.get(key, {}), "hash": digest}
+        save_snapshots(snapshots)
+
+
+def watch():
+    files = scan()
+    now = time_ns()
+    for path, mtime in files.items():
+        if _watched.get(path) == mtime or now - mtime < settle_time:
+            continue  # unchanged, or possibly still being written
+        _watched[path] = mtime
+        try:
+            publish_dropped(path)
+        except Exception as e:  # keep watching the other files
+            print(f"{e!r}, publishing {path} failed")
+
+
+def next_refresh(now, unchanged):
+    # refreshes follow the exchange session: from the open until shortly after
+    # the (possibly early) close, none on holidays or weekends. the interval
+    # doubles with each download that brought nothing new
+    session_open, session_close = session_at(now, after_close)
+    if now < session_open:
+        return session_open
+    interval = refresh_interval
+    if zero_dte_interval and (
+        now < session_open + edge or now > session_close - edge
+    ):  # tighter around the open and close, when 0DTE moves fastest
+        interval = zero_dte_interval
+    later = now + timedelta(minutes=min(interval * 2**unchanged, max_interval))
+    # always catch the snapshot taken at the close
+    return min(later, session_close + after_close)
+
+
+def plan_refresh(sched, now, unchanged):
+    sched.add_job(
+        refresh,
+        "date",
+        args=[sched],
+        run_date=next_refresh(now, unchanged),
+        id="refresh",
+        replace_existing=True,
+        misfire_grace_time=None,  # run late rather than break the chain
+    )
+
+
+def refresh(sched):
+    global _unchanged
+    try:
+        _unchanged = 0 if sensor() else _unchanged + 1
+    finally:
+        now = datetime.now(timezone.utc)
+        if now < session_at(now, after_close)[0]:
+            _unchanged = 0  # the next session starts at the regular cadence
+        plan_refresh(sched, now, _unchanged)
+
+
+def schedule(sched):
+    global _sched
+    _sched = sched
+    # schedule when to redownload data
+    plan_refresh(sched, datetime.now(timezone.utc), 0)
+    if watch_interval:
+        # manually supplied and third-party chain files go live in seconds
+        sched.add_job(watch, "interval", seconds=watch_interval, coalesce=True)
+    # keep the stored 10 yr yield fresh without blocking calculations on yfinance
+    sched.add_job(refresh_rate, "interval", hours=1, next_run_time=datetime.now())
+    # tab labels are served from stored ticker names, refreshed daily
+    sched.add_job(
+        refresh_ticker_info, "interval", hours=24, next_run_time=datetime.now()
+    )
+    return sched
+
+
+def run(sched, prompt):
+    print(f"\ningest running in process {getpid()}\n")
+    schedule(sched)  # jobs, retries included, run once the scheduler starts
+    # respond to prompt if env variable not set
+    response = environ.get("AUTO_RESPONSE")
+    if not response:
+        try:
+            response = input("\nDownload recent data? (y/n): ") if prompt else "n"
+        except EOFError:
+            response = "n"
+    if response.strip().lower() == "y":  # download data at start
+        changed = sensor()
+    else:
+        print("\nUsing existing data...\n")
+        changed = []
+    # precompute tickers that were not downloaded from stored data
+    tickers_pool = (environ.get("TICKERS") or "^SPX,^NDX,^RUT").strip().split(",")
+    for ticker in tickers_pool:
+        ticker = ticker[1:] if ticker[0] == "^" else ticker
+        if ticker not in changed:
+            complete = publish_stored(ticker.lower())
+            if complete is not None:
+                check_published(ticker.lower(), complete)
+    _watched.update(scan())  # everything stored so far has been published
+    sched.start()
+
+
+def take_over():
+    acquire_lock(blocking=True)  # wait for the running ingest process to exit
+    run(BackgroundScheduler(daemon=True), prompt=False)
+
+
+def start_ingest():
+    # called by each web worker: the first to take the lock runs ingest in the
+    # background, the others stand by to take over should it exit. set
+    # INGEST=external when running `python -m modules.ingest` instead. workers
+    # start serving at once and never wait on stdin: only the standalone
+    # process asks whether to download, see AUTO_RESPONSE
+    if environ.get("INGEST") == "external":
+        return
+    if acquire_lock(blocking=False):
+        # results published by a previous run are served until replaced
+        threading.Thread(
+            target=run, args=(BackgroundScheduler(daemon=True), False), daemon=True
+        ).start()
+    else:
+        print(f"\ningest running in another process, {getpid()} serves only\n")
+        threading.Thread(target=take_over, daemon=True).start()
+
+
+if __name__ == "__main__":
+    ensure_table()
+    if not acquire_lock(blocking=False):
+        print("\nwaiting for the running ingest process to exit...\n")
+        acquire_lock(blocking=True)
+    run(BlockingScheduler(), prompt=True)
@@ -1,6 +1,6 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-from yfinance import Tickers
+from modules.ticker_info import ticker_names
 from os import environ
 
 
@@ -10,8 +10,7 @@ def format_ticker(ticker):
 
 def serve_layout():
     tickers_list = (environ.get("TICKERS") or "^SPX,^NDX,^RUT").strip().split(",")
-    tickers = Tickers(tickers_list)
-    ticker_info = {ticker: tickers.tickers[ticker].info for ticker in tickers_list}
+    names = ticker_names()  # in-memory, refreshed in the background
     return dbc.Container(
         [
             dcc.Store(
@@ -69,18 +68,19 @@ def serve_layout():
                     className="mx-auto d-flex justify-content-center",
                 )
             ),
-            dcc.Interval(
-                id="interval", interval=1000 * 3 * 1, n_intervals=0
-            ),  # every three seconds, check if chart should be refreshed
+            # generation of each ticker's results, set by assets/updates.js
+            # when one is published, to check if chart should be refreshed
+            dcc.Store(id="generations"),
             dcc.Store(id="refresh", storage_type="local"),
+            dcc.Store(id="chart-version"),  # data the chart was rendered from
             dbc.Row(
                 dbc.Tabs(
                     id="tabs",
                     children=[
                         dbc.Tab(
                             label=(
-                                f"{ticker_info[ticker]['longName']} ({format_ticker(ticker)})"
-                                if isinstance(ticker_info[ticker], dict)
+                                f"{names[ticker]} ({format_ticker(ticker)})"
+                                if ticker in names
                                 else format_ticker(ticker)
                             ),
                             tab_id=format_ticker(ticker),
@@ -0,0 +1,57 @@
+import orjson
+from yfinance import Ticker
+from datetime import datetime
+from cachetools import cached, TTLCache
+from pathlib import Path
+from os import environ, getcwd
+from modules.ticker_dwn import write_atomic
+
+# last known 10 yr treasury yield, refreshed in the background so computing
+# exposures never waits on a network request
+_rate_file = Path(f"{getcwd()}/data/ten_yr.json")
+default_rate = 0.04  # used until a yield has been stored
+
+
+@cached(cache=TTLCache(maxsize=1, ttl=60))  # re-read the store at most every min
+def risk_free_rate():
+    # RISK_FREE_RATE env var, then RISK_FREE_RATE_FILE, then the stored yield
+    rate = environ.get("RISK_FREE_RATE")
+    if rate:
+        return float(rate)
+    try:
+        with open(environ.get("RISK_FREE_RATE_FILE") or _rate_file, "rb") as f:
+            data = orjson.loads(f.read())
+        # override files may hold a bare number
+        return float(data["rate"] if isinstance(data, dict) else data)
+    except (OSError, orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        return default_rate
+
+
+def refresh_rate():
+    if environ.get("RISK_FREE_RATE") or environ.get("RISK_FREE_RATE_FILE"):
+        return
+    try:
+        data = Ticker("^TNX").history(period="1mo")
+    except Exception as e:  # keep serving the stored yield
+        print(f"{e}, 10 yr yield refresh failed")
+        return
+    if data.empty:
+        print("10 yr yield unavailable, keeping stored rate")
+        return
+    # most recent close
+    write_atomic(
+        _rate_file,
+        orjson.dumps(
+            {
+                "rate": data.tail(1)["Close"].item() / 100,
+                "date": data.index[-1].strftime("%Y-%m-%d"),
+                "updated": datetime.now().isoformat(timespec="seconds"),
+            }
+        ),
+    )
+    risk_free_rate.cache_clear()
+
+
+if __name__ == "__main__":
+    refresh_rate()
+    print(risk_free_rate())
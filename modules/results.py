@@ -0,0 +1,286 @@
+import threading
+import mmap
+import shutil
+from contextlib import contextmanager
+from hashlib import blake2b
+from flask_caching.backends import FileSystemCache
+from datetime import timedelta
+from time import time_ns
+from pathlib import Path
+from os import environ, getcwd, stat
+
+try:
+    import fcntl
+except ImportError:  # windows, where the app runs as a single process
+    fcntl = None
+from modules.codec import encode, decode
+from modules.ticker_dwn import write_atomic
+from modules.calc import get_options_data, load_chain, read_chain, analyze_chain
+
+# results shared by every process: the ingest process publishes them and the
+# web workers read them. each publish writes a new generation of a ticker's
+# results to a file of its own, then moves the ticker's generation pointer
+# file (data/results/{ticker}.gen) over to it in a single atomic replace and
+# removes the old file, so readers never find a ticker half published or cold
+cache = FileSystemCache("cache", threshold=0, default_timeout=0)
+_store_dir = Path(f"{getcwd()}/data/results")
+# figures rendered from a generation, a directory per ticker and generation
+_figures_dir = Path(f"{getcwd()}/data/figures")
+# results are stored as raw array buffers rather than pickled, see codec
+compress = environ.get("CACHE_COMPRESS") == "1"
+# each process maps the files read-only, and results are served as views of
+# the mapping: the pages are shared by all workers through the os page cache
+# rather than copied into each. a generation's file never changes, and a
+# generation pointer is re-read only once its file has been replaced
+_mapped = {}  # ticker: (generation, published entries)
+_pointers = {}  # ticker: (pointer file stamp, generation)
+# a result missing from the cache is computed once: other threads wait on an
+# in-process lock, other workers on a lock file. keys share a fixed set of
+# locks of each kind, so neither the locks nor their files grow with the keys
+_locks_dir = Path(f"{getcwd()}/data/locks")
+_stripes = 64
+_flights = {}  # (kind, stripe): lock
+_flights_lock = threading.Lock()
+
+expirations = ["monthly", "opex", "0dte", "all"]
+
+
+def tickers():
+    tickers_pool = (environ.get("TICKERS") or "^SPX,^NDX,^RUT").strip().split(",")
+    return [(t[1:] if t[0] == "^" else t).lower() for t in tickers_pool]
+
+
+def is_known(ticker, expir=None):
+    # requests name their ticker and expiration, which go into file names and
+    # lock keys: only the configured ones are looked up or computed
+    return ticker in tickers() and (expir is None or expir in expirations)
+
+
+def store_result(key, data, timeout=None):
+    cache.set(key, encode(data, compress), timeout=timeout)
+
+
+def load_result(key):
+    data = cache.get(key)
+    try:
+        return decode(data) if data is not None else None
+    except ValueError:  # written by an older version, computed again
+        return None
+
+
+def store_file(ticker, gen):
+    return _store_dir / f"{ticker}_{gen}.gfx"
+
+
+def figures_dir(ticker, gen):
+    return _figures_dir / f"{ticker}_{gen}"
+
+
+def pointer_file(ticker):
+    return _store_dir / f"{ticker}.gen"
+
+
+def generation(ticker):
+    # current generation of a ticker's published results, None until published
+    if not is_known(ticker):
+        return None
+    try:
+        pointer = stat(pointer_file(ticker))
+        stamp = (pointer.st_ino, pointer.st_mtime_ns)
+        known = _pointers.get(ticker)
+        if known and known[0] == stamp:
+            return known[1]
+        gen = pointer_file(ticker).read_text() or None
+    except FileNotFoundError:
+        return None
+    _pointers[ticker] = (stamp, gen)
+    return gen
+
+
+def map_published(ticker, gen):
+    with open(store_file(ticker, gen), "rb") as f:
+        published = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    # the arrays keep the mapping open for as long as they are referenced
+    return decode(published)
+
+
+def get_published(ticker, expir, kind, gen=None):
+    # "result" or "sync" entry of the given generation, by default the
+    # current one. None once the given generation was removed
+    for _ in range(2):  # the pointer may move on, and remove, between reads
+        current = gen or generation(ticker)
+        if current is None:
+            return None
+        mapped = _mapped.get(ticker)
+        if mapped is None or mapped[0] != current:
+            try:
+                mapped = (current, map_published(ticker, current))
+            except FileNotFoundError:
+                if gen:
+                    return None
+                continue
+            except ValueError:  # written by an older version, until replaced
+                return None
+            if current == generation(ticker):  # else already replaced
+                _mapped[ticker] = mapped
+        return mapped[1].get(expir, {}).get(kind)
+    return None
+
+
+@contextmanager
+def single_flight(kind, key):
+    # a lock of one kind may be taken while holding one of another, never of
+    # the same kind, so keys sharing a lock cannot deadlock
+    digest = blake2b(key.encode(), digest_size=8).digest()
+    stripe = int.from_bytes(digest, "little") % _stripes
+    with _flights_lock:
+        flight = _flights.setdefault((kind, stripe), threading.Lock())
+    with flight:
+        if fcntl is None:
+            yield
+            return
+        _locks_dir.mkdir(exist_ok=True)
+        with open(_locks_dir / f"{kind}_{stripe}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # released when the file closes
+            yield
+
+
+def stored_result(ticker, expir):
+    data = get_published(ticker, expir, "result")
+    return data if data is not None else load_result(f"{ticker}_{expir}_result")
+
+
+def analyze_data(ticker, expir):
+    # published result, or analyze stored data of specified ticker and expiry
+    # if nothing was published yet
+    if not is_known(ticker, expir):
+        return (None,) * 14
+    data = stored_result(ticker, expir)
+    if data is not None:
+        return data
+    with single_flight("result", f"{ticker}_{expir}"):
+        data = stored_result(ticker, expir)  # computed while waiting
+        if data is None:
+            # defaults: json format, timezone 'America/New_York'
+            result = get_options_data(
+                ticker,
+                expir,
+                is_json=True,  # False for CSV
+                tz="America/New_York",
+            )
+            data = result if result else (None,) * 14
+            store_result(f"{ticker}_{expir}_result", data, timeout=60 * 15)  # 15 min
+    return data
+
+
+def sync_data(ticker, expir, data):
+    return {  # for client/server sync
+        "ticker": ticker,
+        "expiration": expir,
+        "spot_price": data[4],
+        "monthly_options_dates": data[3],
+        "today_ddt": data[1],
+        "today_ddt_string": data[2],
+        "zero_delta": data[12],
+        "zero_gamma": data[13],
+    }
+
+
+def get_sync(ticker, expir):
+    if not is_known(ticker, expir):
+        return None
+    data = get_published(ticker, expir, "sync")
+    return data if data is not None else cache.get(f"{ticker}_{expir}")
+
+
+def data_version(ticker, expir):
+    # what a chart is rendered from, small enough for the client to hold and
+    # send back when checking for new data
+    gen = generation(ticker)
+    data = gen and get_published(ticker, expir, "sync", gen)
+    data = data or get_sync(ticker, expir) or {}
+    return {
+        "ticker": ticker,
+        "expiration": expir,
+        "generation": gen,
+        "today_ddt_string": data.get("today_ddt_string"),
+        "spot_price": data.get("spot_price"),
+    }
+
+
+def cache_data(ticker, expir):
+    data = analyze_data(ticker, expir)
+    if get_sync(ticker, expir) is None:
+        cache.set(f"{ticker}_{expir}", sync_data(ticker, expir, data), timeout=60 * 15)
+    return data
+
+
+def is_complete(data, expir):
+    # a total delta exposure of 0 before the expiration has passed means the
+    # feed left out greeks
+    cube, today_ddt, _, monthly_options_dates = data[:4]
+    if cube is None:
+        return False
+    return not (
+        cube["total"]["total_delta"] == 0
+        and (
+            expir not in ["0dte", "opex"]
+            or (
+                expir == "0dte"
+                and today_ddt < monthly_options_dates[0] + timedelta(minutes=15)
+            )
+            or (
+                expir == "opex"
+                and today_ddt < monthly_options_dates[1] + timedelta(minutes=15)
+            )
+        )
+    )
+
+
+def publish_chain(ticker, chain):
+    # a new generation for this ticker only, so other tickers stay cached.
+    # returns whether every view looks complete
+    gen = f"{time_ns():x}"
+    published = {}
+    complete = True
+    for expir in expirations:
+        result = analyze_chain(chain, ticker, expir, tz="America/New_York")
+        data = result if result else (None,) * 14
+        published[expir] = {"result": data, "sync": sync_data(ticker, expir, data)}
+        complete = complete and is_complete(data, expir)
+    _store_dir.mkdir(exist_ok=True)
+    write_atomic(store_file(ticker, gen), encode(published, compress))
+    # readers move to the new generation at once, the pointer being replaced
+    # rather than rewritten
+    write_atomic(pointer_file(ticker), gen.encode())
+    # processes that mapped an old file keep reading it until they move on.
+    # generations left by an earlier run, or by one that stopped between
+    # writing and moving the pointer, go as well. this process lets go of its
+    # own mapping first; a file still mapped or open somewhere cannot be
+    # removed on windows, and is left for the next publish to remove
+    _mapped.pop(ticker, None)
+    for old in _store_dir.glob(f"{ticker}_*.gfx"):
+        if old != store_file(ticker, gen):
+            try:
+                old.unlink(missing_ok=True)
+            except OSError:
+                pass
+    for old in _figures_dir.glob(f"{ticker}_*"):
+        if old != figures_dir(ticker, gen):
+            shutil.rmtree(old, ignore_errors=True)
+    print("published", ticker)
+    return complete
+
+
+def publish(ticker, snapshot, is_json):
+    # recompute a ticker as soon as its download lands. the snapshot is
+    # parsed once from memory for all expirations
+    return publish_chain(ticker, read_chain(snapshot, is_json, tz="America/New_York"))
+
+
+def publish_stored(ticker):
+    # defaults: json format, timezone 'America/New_York'
+    # returns whether every view looks complete, None if nothing is stored
+    chain = load_chain(ticker, is_json=True, tz="America/New_York")  # False for CSV
+    if chain:
+        return publish_chain(ticker, chain)
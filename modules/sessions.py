@@ -0,0 +1,143 @@
+import numpy as np
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from io import BytesIO
+from pathlib import Path
+from os import getcwd
+from modules.ticker_dwn import write_atomic
+
+# XNYS sessions and monthly OPEX dates are built once with exchange_calendars
+# and persisted, so lookups on the request path are plain numpy searches
+_table_file = Path(f"{getcwd()}/data/xnys_sessions.npz")
+_table = None
+_busdaycal = None
+
+
+def build_table(first_year, last_year):
+    import exchange_calendars as xcals  # only needed to (re)build the table
+
+    calendar = xcals.get_calendar(
+        "XNYS", start=f"{first_year}-01-01", end=f"{last_year}-12-31"
+    )
+    sessions = calendar.sessions.values.astype("datetime64[D]")
+    # weekdays the exchange is closed, for holiday-aware business day counts
+    weekdays = np.arange(sessions[0], sessions[-1] + 1, dtype="datetime64[D]")
+    weekdays = weekdays[np.is_busday(weekdays)]
+    holidays = np.setdiff1d(weekdays, sessions)
+
+    # per month: third Friday if open, else the Thursday before it, and the
+    # month's last session
+    months = np.arange(
+        np.datetime64(f"{first_year}-01"),
+        np.datetime64(f"{last_year + 1}-01"),
+        dtype="datetime64[M]",
+    )
+    first_days = months.astype("datetime64[D]")
+    third_fridays = np.busday_offset(first_days, 2, roll="forward", weekmask="Fri")
+    opex = np.where(np.isin(third_fridays, sessions), third_fridays, third_fridays - 1)
+    month_ends = sessions[
+        np.searchsorted(sessions, (months + 1).astype("datetime64[D]"), "left") - 1
+    ]
+    return {
+        "sessions": sessions,
+        "opens": calendar.opens.values.astype("datetime64[m]"),
+        "closes": calendar.closes.values.astype("datetime64[m]"),
+        "holidays": holidays,
+        "months": months,
+        "opex": opex,
+        "month_ends": month_ends,
+    }
+
+
+def save_table(table):
+    # every worker may build the table at once on a fresh deploy: each writes
+    # a file of its own and the last one in place wins, all being the same
+    buf = BytesIO()
+    np.savez(buf, **table)
+    write_atomic(_table_file, buf.getvalue())
+
+
+def ensure_table(today=None):
+    # called at startup: rebuild the persisted table when it is missing or no
+    # longer covers the next year of expirations
+    global _table, _busdaycal
+    year = (today or datetime.now()).year
+    try:
+        table = dict(np.load(_table_file))
+        covered = table["months"][0] <= np.datetime64(f"{year - 1}-01") and (
+            table["months"][-1] >= np.datetime64(f"{year + 1}-12")
+        )
+    except (OSError, KeyError, ValueError):
+        covered = False
+    if not covered:
+        table = build_table(year - 10, year + 3)
+        try:
+            save_table(table)
+        except OSError as e:  # built again by the next process to start
+            print(f"{e}, saving the sessions table failed")
+    _table = table
+    _busdaycal = np.busdaycalendar(holidays=table["holidays"])
+    return table
+
+
+def get_table():
+    return _table if _table is not None else ensure_table()
+
+
+def busday_count(start, ends):
+    # exchange sessions in [start, end), like np.busday_count but skipping
+    # XNYS holidays
+    get_table()
+    return np.busday_count(start, ends, busdaycal=_busdaycal)
+
+
+def month_dates(dates):
+    # monthly OPEX and last session of the month for each date. months outside
+    # the table fall back to the plain third Friday and last weekday
+    table = get_table()
+    months = np.asarray(dates, dtype="datetime64[D]").astype("datetime64[M]")
+    idx = (months - table["months"][0]).astype(int)
+    inside = (idx >= 0) & (idx < len(table["months"]))
+    idx = np.clip(idx, 0, len(table["months"]) - 1)
+    first_days = months.astype("datetime64[D]")
+    opex = np.where(
+        inside,
+        table["opex"][idx],
+        np.busday_offset(first_days, 2, roll="forward", weekmask="Fri"),
+    )
+    month_ends = np.where(
+        inside,
+        table["month_ends"][idx],
+        np.busday_offset((months + 1).astype("datetime64[D]"), -1, roll="forward"),
+    )
+    return opex, month_ends
+
+
+def monthly_opex(date, tz):
+    # OPEX and month end of the date's month, at 4pm in the given timezone
+    opex, month_end = month_dates(np.datetime64(date.date()))
+    close = time(16, tzinfo=ZoneInfo(tz))
+    return (
+        datetime.combine(opex.item(), close),
+        datetime.combine(month_end.item(), close),
+    )
+
+
+def session_at(when, grace=timedelta(0)):
+    # open and close (utc) of the session in progress at `when`, or of the
+    # next one. a session counts as in progress until `grace` after its close,
+    # early closes included
+    table = get_table()
+    t = np.datetime64(when.astimezone(timezone.utc).replace(tzinfo=None) - grace, "m")
+    i = np.searchsorted(table["closes"], t, "right")
+    if i == len(table["closes"]):  # past the stored sessions
+        table = ensure_table(when)
+        i = np.searchsorted(table["closes"], t, "right")
+    return (
+        table["opens"][i].item().replace(tzinfo=timezone.utc),
+        table["closes"][i].item().replace(tzinfo=timezone.utc),
+    )
+
+
+if __name__ == "__main__":
+    ensure_table()
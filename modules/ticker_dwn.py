@@ -1,18 +1,168 @@
-import requests
-import base64
+import asyncio
+import aiohttp
+import binascii
 import orjson
-from multiprocessing.dummy import Pool as ThreadPool
+from hashlib import blake2b
 from datetime import datetime
-from os import environ, getcwd
+from os import environ, fsync, getcwd, getpid, replace
+from threading import get_ident
 from pathlib import Path
-from functools import partial
+from time import monotonic
+from dotenv import load_dotenv
 
+if __name__ == "__main__":
+    load_dotenv()  # run on its own: the limits below are read on import
+
+# download limits, see README for the matching env variables
+concurrency = int(environ.get("DWN_CONCURRENCY") or 4)  # requests in flight
+rate_limit = float(environ.get("DWN_RATE") or 4)  # requests per second
+req_timeout = float(environ.get("DWN_TIMEOUT") or 30)  # seconds per attempt
+max_tries = int(environ.get("DWN_TRIES") or 3)
+backoff = 1  # seconds before the first retry, doubled after each attempt
+retry_statuses = {429, 500, 502, 503, 504}
+# downloaded tickers waiting to be published, and threads publishing them
+pipeline_depth = int(environ.get("PIPELINE_DEPTH") or 2)
+publish_workers = int(environ.get("PUBLISH_WORKERS") or 1)
+chunk_size = 1 << 20  # csv responses are decoded in chunks of up to 1 MiB
+inline_size = 1 << 16  # smaller chunks are decoded on the event loop
+# per ticker validators (ETag / Last-Modified) and data hash of the last
+# stored download
+_snapshots_file = Path(f"{getcwd()}/data/snapshots.json")
+
+
+class TokenBucket:
+    # spaces requests out to `rate` per second, allowing bursts of `capacity`
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def b64decode_lines(buf):
+    # csv downloads hold one base64 encoded csv line per line, each with its
+    # own (often missing) padding
+    return b"".join(
+        [
+            binascii.a2b_base64(line + b"=" * (-len(line) % 4)) + b"\n"
+            for line in buf.translate(None, b"=").splitlines()
+        ]
+    )
+
+
+class Base64Lines:
+    # decodes base64 lines as the response streams in. a line split between
+    # chunks is held back until the rest of it arrives, and large buffers are
+    # decoded off the event loop
+    def __init__(self):
+        self.tail = b""
+
+    async def decode(self, buf):
+        if len(buf) < inline_size:
+            return b64decode_lines(buf)
+        return await asyncio.to_thread(b64decode_lines, buf)
+
+    async def feed(self, chunk):
+        cut = chunk.rfind(b"\n") + 1
+        if not cut:
+            self.tail += chunk
+            return b""
+        buf, self.tail = self.tail + chunk[:cut], chunk[cut:]
+        return await self.decode(buf)
+
+    async def flush(self):
+        buf, self.tail = self.tail, b""
+        return await self.decode(buf) if buf else b""
+
+
+def load_snapshots():
+    try:
+        with open(_snapshots_file, "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+
+def write_atomic(filename, data):
+    # readers see either the old file or the complete new one, never a partial.
+    # the ingest thread and the web threads of a worker may write the same file
+    tmp_file = filename.with_name(f".{filename.name}.{getpid()}.{get_ident()}.tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(data)
+        f.flush()
+        fsync(f.fileno())
+    replace(tmp_file, filename)
+
+
+def save_snapshots(snapshots):
+    write_atomic(_snapshots_file, orjson.dumps(snapshots))
 
-def fulfill_req(ticker, is_json, session):
+
+def snapshot_hash(data, is_json, payload=None):
+    # hash of a stored snapshot's data, leaving out the timestamp so identical
+    # chains published at a new time compare equal
+    if is_json:
+        # the parsed data member, wherever it sits in the payload. payloads
+        # without one are hashed whole
+        if payload is None:
+            payload = orjson.loads(data)
+        member = payload.get("data") if isinstance(payload, dict) else None
+        if member is not None:
+            data = orjson.dumps(member)
+        return blake2b(data, digest_size=16).hexdigest()
+    start = data.index(b"\n", data.index(b"\n") + 1) + 1
+    end = data.index(b"\n", start) + 1
+    digest = blake2b(data[:start], digest_size=16)
+    digest.update(memoryview(data)[end:])  # all but the "Date:" line
+    return digest.hexdigest()
+
+
+def decode_data(body, is_json):
+    # file contents, their hash, and the snapshot itself for publishing
+    # straight from memory
+    if is_json:
+        # incoming json data, stored as received
+        payload = orjson.loads(body)
+        if not isinstance(payload.get("data"), dict):
+            raise ValueError("no data in response")
+        return body, snapshot_hash(body, is_json, payload), payload
+    # incoming csv data, decoded while downloading
+    return body, snapshot_hash(body, is_json), body
+
+
+async def persist(filename, data, snapshots, key):
+    # raw snapshots are kept for restarts and auditing, written off the
+    # publishing path
+    try:
+        await asyncio.to_thread(write_atomic, filename, data)
+    except OSError as e:
+        print(f"{e}, storing {filename.name} failed")
+        snapshots.pop(key, None)  # download again next time
+
+
+async def fulfill_req(ticker, is_json, session, bucket, slots, snapshots, writes):
     api_url = (
-        environ.get("API_URL")
-        or f"https://cdn.cboe.com/api/global/delayed_quotes/options/{ticker.upper()}.json"
-    ).strip()
+        (
+            environ.get("API_URL")
+            or "https://cdn.cboe.com/api/global/delayed_quotes/options/{ticker}.json"
+        )
+        .strip()
+        .replace("{ticker}", ticker.upper())
+    )
     ticker = ticker.lower() if ticker[0] != "_" else ticker[1:].lower()
     d_format = "json" if is_json else "csv"
     filename = (
@@ -20,38 +170,119 @@ def fulfill_req(ticker, is_json, session):
         if is_json
         else Path(f"{getcwd()}/data/csv/{ticker}_quotedata.csv")
     )
-    with open(filename, "wb") as f, session.get(api_url) as r:
-        for _ in range(3):  # in case of unavailable data, retry twice
-            try:  # check if data is available
-                r.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                print(e)
-                f.write("Unavailable".encode("utf-8"))
-                if r.status_code == 504:  # check if timeout occurred
-                    print("gateway timeout, retrying search for", ticker, d_format)
-                    continue
-                elif r.status_code == 500:  # internal server error
-                    print(
-                        "internal server error, retrying search for", ticker, d_format
-                    )
-                    continue
-            else:
-                if is_json:
-                    # incoming json data
-                    f.write(orjson.dumps(r.json()))
-                else:
-                    # incoming csv data
-                    for line in r.iter_lines():
-                        if len(line) % 4:
-                            # add padding:
-                            line += b"==="
-                        f.write(base64.b64decode(line) + "\n".encode("utf-8"))
-                print("\nrequest done for", ticker, d_format)
-                break
-
-
-def dwn_data(select, is_json):
-    pool = ThreadPool()
+    key = f"{ticker}_{d_format}"
+    snapshot = snapshots.get(key, {})
+    headers = {}
+    if filename.exists():  # only ask for changes to data we still have
+        if snapshot.get("etag"):
+            headers["If-None-Match"] = snapshot["etag"]
+        if snapshot.get("last_modified"):
+            headers["If-Modified-Since"] = snapshot["last_modified"]
+    for attempt in range(max_tries):
+        if attempt:  # exponential backoff before re-requesting
+            await asyncio.sleep(backoff * 2 ** (attempt - 1))
+        async with slots:
+            await bucket.acquire()
+            try:
+                async with session.get(api_url, headers=headers) as r:
+                    if r.status == 304:
+                        print("\nno new data for", ticker, d_format)
+                        return
+                    if r.status in retry_statuses:
+                        print(f"{r.status} {r.reason}, retrying", ticker, d_format)
+                        continue
+                    r.raise_for_status()
+                    if is_json:
+                        body = await r.read()
+                    else:
+                        decoder = Base64Lines()
+                        parts = [
+                            await decoder.feed(chunk)
+                            async for chunk in r.content.iter_chunked(chunk_size)
+                        ]
+                        parts.append(await decoder.flush())
+                        body = b"".join(parts)
+                    validators = {
+                        "etag": r.headers.get("ETag"),
+                        "last_modified": r.headers.get("Last-Modified"),
+                    }
+            except aiohttp.ClientResponseError as e:
+                # not found or rejected, retrying won't help
+                print(f"{e.status} {e.message}, {ticker} {d_format} unavailable")
+                return
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"{e!r}, retrying", ticker, d_format)
+                continue
+        try:
+            data, digest, decoded = await asyncio.to_thread(decode_data, body, is_json)
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            print(f"{e!r}, retrying", ticker, d_format)
+            continue
+        snapshots[key] = {**validators, "hash": digest}
+        if digest == snapshot.get("hash") and filename.exists():
+            print("\nsame data for", ticker, d_format)
+            return
+        # the file is only replaced once a full response has arrived
+        writes.append(asyncio.create_task(persist(filename, data, snapshots, key)))
+        print("\nrequest done for", ticker, d_format)
+        return decoded
+    print("\nrequest failed for", ticker, d_format)
+
+
+async def publish_ready(ready, publish, is_json):
+    while True:
+        ticker, snapshot = await ready.get()
+        try:
+            await asyncio.to_thread(publish, ticker, snapshot, is_json)
+        except Exception as e:  # keep publishing the other tickers
+            print(f"{e!r}, publishing {ticker} failed")
+        finally:
+            ready.task_done()
+
+
+async def fetch_all(tickers_format, is_json, publish=None):
+    bucket = TokenBucket(rate_limit, max(1, rate_limit))
+    slots = asyncio.Semaphore(concurrency)
+    snapshots = load_snapshots()
+    stored = dict(snapshots)
+    writes = []
+    # each ticker's snapshot moves on in memory to be parsed, computed and
+    # published as soon as its own download lands; the bounded queue holds
+    # back downloads while publishing falls behind
+    ready = asyncio.Queue(maxsize=pipeline_depth)
+    publishers = [
+        asyncio.create_task(publish_ready(ready, publish, is_json))
+        for _ in range(publish_workers if publish else 0)
+    ]
+
+    async def fetch(ticker):
+        snapshot = await fulfill_req(
+            ticker, is_json, session, bucket, slots, snapshots, writes
+        )
+        if snapshot is None:
+            return False
+        if publish:
+            await ready.put(
+                (ticker.lower() if ticker[0] != "_" else ticker[1:].lower(), snapshot)
+            )
+        return True
+
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=concurrency),
+        timeout=aiohttp.ClientTimeout(total=req_timeout),
+        headers={"Accept": "application/json" if is_json else "text/csv"},
+    ) as session:
+        changed = await asyncio.gather(*(fetch(ticker) for ticker in tickers_format))
+    await ready.join()
+    for publisher in publishers:
+        publisher.cancel()
+    await asyncio.gather(*writes)
+    if snapshots != stored:
+        save_snapshots(snapshots)
+    return changed
+
+
+def dwn_data(select, is_json, publish=None):
     print(f"\ndownload start: {datetime.now()}\n")
     tickers_pool = (environ.get("TICKERS") or "^SPX,^NDX,^RUT").strip().split(",")
     if select:  # select tickers to download
@@ -59,13 +290,14 @@ def dwn_data(select, is_json):
     tickers_format = [
         f"_{ticker[1:]}" if ticker[0] == "^" else ticker for ticker in tickers_pool
     ]
-    session = requests.Session()
-    session.headers.update({"Accept": "application/json" if is_json else "text/csv"})
-    fulfill_req_with_args = partial(fulfill_req, is_json=is_json, session=session)
-    pool.map(fulfill_req_with_args, tickers_format)
-    pool.close()
-    pool.join()
+    changed = asyncio.run(fetch_all(tickers_format, is_json, publish))
     print(f"\n\ndownload end: {datetime.now()}\n")
+    # tickers with new data, unchanged (304) and failed downloads are left out
+    return [
+        ticker[1:] if ticker[0] == "^" else ticker
+        for ticker, is_changed in zip(tickers_pool, changed)
+        if is_changed
+    ]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+import orjson
+from yfinance import Tickers
+from datetime import datetime, timedelta
+from cachetools import cached, TTLCache
+from pathlib import Path
+from os import environ, getcwd
+from modules.ticker_dwn import write_atomic
+
+# display names for the ticker tabs, stored locally and refreshed in the
+# background so serving the layout never calls yfinance
+_info_file = Path(f"{getcwd()}/data/ticker_info.json")
+max_age = timedelta(days=7)  # names rarely change
+
+
+def load_info():
+    try:
+        with open(_info_file, "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+
+@cached(cache=TTLCache(maxsize=1, ttl=60 * 60))  # re-read the store at most hourly
+def ticker_names():
+    return {ticker: info["longName"] for ticker, info in load_info().items()}
+
+
+def refresh_ticker_info():
+    tickers_list = (environ.get("TICKERS") or "^SPX,^NDX,^RUT").strip().split(",")
+    info = load_info()
+    stale = [
+        ticker
+        for ticker in tickers_list
+        if ticker not in info
+        or datetime.now() - datetime.fromisoformat(info[ticker]["updated"]) > max_age
+    ]
+    if not stale:
+        return
+    tickers = Tickers(stale)
+    updated = False
+    for ticker in stale:
+        try:
+            long_name = tickers.tickers[ticker].info["longName"]
+        except Exception as e:  # keep the stored name, retry on the next refresh
+            print(f"{e}, name unavailable for {ticker}")
+            continue
+        info[ticker] = {
+            "longName": long_name,
+            "updated": datetime.now().isoformat(timespec="seconds"),
+        }
+        updated = True
+    if not updated:
+        return
+    write_atomic(_info_file, orjson.dumps(info))
+    ticker_names.cache_clear()
+
+
+if __name__ == "__main__":
+    refresh_ticker_info()
+    print(ticker_names())
@@ -0,0 +1,59 @@
+import threading
+from time import sleep
+from os import environ
+from modules.results import generation, tickers
+
+# browsers hold a request to /updates open until a ticker is published again,
+# rather than asking every few seconds whether it was. one thread per process
+# watches the generation pointers for all of the held requests
+hold = float(environ.get("UPDATES_HOLD") or 25)  # seconds, then reply unchanged
+# a held request takes a thread of the worker, the same threads that serve the
+# chart callbacks. at most `slots` requests are held per worker, so the others
+# are always left for callbacks. tabs beyond that are answered at once and ask
+# again after `retry` seconds instead
+slots = int(environ.get("UPDATES_SLOTS") or 16)
+retry = float(environ.get("UPDATES_RETRY") or 5)  # seconds
+_slots = threading.BoundedSemaphore(slots) if slots > 0 else None
+_check_every = 1  # seconds
+_changed = threading.Condition()
+_token = None  # the current generations of all tickers, as one string
+_generations = {}
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def watch():
+    global _token, _generations
+    while True:
+        generations = {ticker: generation(ticker) for ticker in tickers()}
+        token = ".".join(gen or "" for gen in generations.values())
+        if token != _token:
+            with _changed:
+                _token, _generations = token, generations
+                _changed.notify_all()
+        sleep(_check_every)
+
+
+def wait_for_update(known):
+    # generations once they differ from the client's token, or after `hold`.
+    # without a free slot, the current generations and when to ask again
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = threading.Thread(target=watch, daemon=True)
+            _watcher.start()
+    held = _slots is not None and _slots.acquire(blocking=False)
+    try:
+        with _changed:
+            if held:
+                _changed.wait_for(lambda: _token is not None and _token != known, hold)
+            else:  # only until the watcher's first look
+                _changed.wait_for(lambda: _token is not None, _check_every)
+            return {
+                "token": _token,
+                "generations": _generations,
+                "retry": 0 if held else retry,
+            }
+    finally:
+        if held:
+            _slots.release()
@@ -0,0 +1,37 @@
+import pytest
+from unittest import mock
+import modules.calc as calc
+from modules.charts import render_chart
+from modules.results import expirations
+
+
+@pytest.fixture(scope="module")
+def spx():
+    # exposure results of the stored SPX chain for each expiration, and the
+    # float64 chain each one was aggregated from
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("RISK_FREE_RATE", "0.045")
+        from modules.rates import risk_free_rate
+
+        risk_free_rate.cache_clear()
+        chain = calc.load_chain("spx", is_json=False, tz="America/New_York")
+        results = {}
+        for expir in expirations:
+            with mock.patch.object(
+                calc, "exposure_cube", wraps=calc.exposure_cube
+            ) as cube:
+                result = calc.analyze_chain(chain, "spx", expir, "America/New_York")
+            results[expir] = result, cube.call_args.args[0]
+        risk_free_rate.cache_clear()
+    return results
+
+
+@pytest.mark.parametrize("expir", expirations)
+@pytest.mark.parametrize("name", ["Delta", "Gamma", "Vanna", "Charm"])
+def test_title_totals(spx, expir, name):
+    result, option_data = spx[expir]
+    fig = render_chart(result, f"Absolute {name} Exposure", "SPX", expir, 1, False)
+    total = option_data[f"total_{name.lower()}"].sum()
+    assert f"Total {name}: ${total * 10**9:,.2f} " in fig.layout.title.text.replace(
+        "<br>", " "
+    )
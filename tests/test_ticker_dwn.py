@@ -0,0 +1,127 @@
+import asyncio
+import orjson
+import pytest
+from aiohttp import web
+import modules.ticker_dwn as ticker_dwn
+
+
+def payload(price, timestamp="2025-06-13 16:00:00"):
+    return orjson.dumps(
+        {"timestamp": timestamp, "data": {"current_price": price, "options": []}}
+    )
+
+
+def status(code, **headers):
+    async def respond(request):
+        return web.Response(status=code, headers=headers)
+
+    return respond
+
+
+def body(data, **headers):
+    async def respond(request):
+        return web.Response(body=data, headers=headers)
+
+    return respond
+
+
+def hang(seconds):
+    async def respond(request):
+        await asyncio.sleep(seconds)
+        return web.Response(body=payload(1))
+
+    return respond
+
+
+@pytest.fixture
+def stored(tmp_path, monkeypatch):
+    # downloads land in a data/ of their own, retried without waiting long
+    (tmp_path / "data" / "json").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ticker_dwn, "_snapshots_file", tmp_path / "data/snapshots.json")
+    monkeypatch.setattr(ticker_dwn, "backoff", 0.01)
+    monkeypatch.setattr(ticker_dwn, "req_timeout", 0.5)
+    monkeypatch.setattr(ticker_dwn, "max_tries", 3)
+    return tmp_path / "data/json/spx_quotedata.json"
+
+
+def fetch(monkeypatch, responses):
+    # SPX downloaded from a local stand-in for the CBOE api, answering each
+    # request with the next of `responses` (the last one repeated). returns
+    # whether it changed, the snapshots it published, and the requests made
+    requests, published = [], []
+
+    async def handler(request):
+        requests.append(request.headers)
+        return await responses[min(len(requests), len(responses)) - 1](request)
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/{name}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        monkeypatch.setenv("API_URL", f"http://127.0.0.1:{port}/{{ticker}}.json")
+        try:
+            return await ticker_dwn.fetch_all(
+                ["_SPX"], True, lambda *args: published.append(args)
+            )
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(run()), published, requests
+
+
+def test_retries_server_errors(stored, monkeypatch):
+    changed, published, requests = fetch(
+        monkeypatch, [status(503), status(502), body(payload(1))]
+    )
+    assert changed == [True] and len(requests) == 3
+    assert published[0][:2] == ("spx", orjson.loads(payload(1)))
+    assert stored.read_bytes() == payload(1)
+
+
+def test_retries_timeouts(stored, monkeypatch):
+    changed, published, requests = fetch(monkeypatch, [hang(2), body(payload(1))])
+    assert changed == [True] and len(requests) == 2
+    assert stored.read_bytes() == payload(1)
+
+
+def test_gives_up_after_max_tries(stored, monkeypatch):
+    changed, published, requests = fetch(monkeypatch, [status(500)])
+    assert changed == [False] and len(requests) == 3
+    assert not published and not stored.exists()
+
+
+@pytest.mark.parametrize("code", [400, 403, 404])
+def test_fails_fast_on_client_errors(stored, monkeypatch, code):
+    changed, published, requests = fetch(monkeypatch, [status(code)])
+    assert changed == [False] and len(requests) == 1
+    assert not published and not stored.exists()
+
+
+def test_not_modified_keeps_stored_data(stored, monkeypatch):
+    fetch(monkeypatch, [body(payload(1), ETag='"v1"')])
+    before = stored.stat()
+    changed, published, requests = fetch(monkeypatch, [status(304)])
+    assert requests[0]["If-None-Match"] == '"v1"'
+    assert changed == [False] and len(requests) == 1 and not published
+    assert stored.read_bytes() == payload(1)
+    assert stored.stat().st_mtime_ns == before.st_mtime_ns
+
+
+def test_same_data_is_unchanged(stored, monkeypatch):
+    fetch(monkeypatch, [body(payload(1))])
+    before = stored.stat()
+    # the same chain at a new time
+    changed, published, requests = fetch(
+        monkeypatch, [body(payload(1, timestamp="2025-06-13 16:15:00"))]
+    )
+    assert changed == [False] and not published
+    assert stored.read_bytes() == payload(1)
+    assert stored.stat().st_mtime_ns == before.st_mtime_ns
+    # while new data is stored and published
+    changed, published, requests = fetch(monkeypatch, [body(payload(2))])
+    assert changed == [True] and stored.read_bytes() == payload(2)